@@ -0,0 +1,226 @@
+import zipfile
+
+from flask import Blueprint, abort, jsonify, request, url_for
+from sqlalchemy.orm import load_only
+
+from application.bulk import enqueue_bulk, read_bulk_uploads
+from application.caching import not_modified, set_validators
+from application.errors import ErrorsByRow
+from application.extensions import csrf, site_cache
+from application.frontend.models import ResultModel, ResultRowModel
+from application.geo import Sites
+from application.utils import CSV_CHUNK_SIZE
+
+api = Blueprint("api", __name__, url_prefix="/api")
+
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# sites closer than this on the map are shown as a cluster
+CLUSTER_PIXELS = 60
+MAX_ZOOM = 20
+
+SUMMARY_COLUMNS = ["valid", "error_count", "row_count", "valid_row_count", "summary"]
+ROW_FIELDS = ["row_number", "data", "input", "errors"]
+# the fields of an error in a goodtables report
+ERROR_FIELDS = ["code", "message", "message-data", "row-number", "column-number", "row"]
+
+
+def requested_fields(allowed, default=None):
+    """Returns the fields named in the fields parameter, in the order given,
+    or the default fields if there is no parameter.
+    """
+    fields = request.args.get("fields")
+    if not fields:
+        return list(default or allowed)
+    fields = [f for f in fields.split(",") if f]
+    unknown = [f for f in fields if f not in allowed]
+    if unknown:
+        abort(400, f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def page_size():
+    limit = request.args.get("limit", PAGE_SIZE, type=int)
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def next_page(items, limit, cursor, endpoint, **values):
+    """Trims items, fetched as up to limit + 1 so the extra one shows there
+    are more, and returns them with the url of the next page if there is one.
+    """
+    if len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    next_url = url_for(
+        endpoint,
+        after=cursor(items[-1]),
+        limit=limit,
+        fields=request.args.get("fields"),
+        **values,
+    )
+    return items, next_url
+
+
+def get_result_or_404(result, columns):
+    result_model = ResultModel.query.options(load_only(*columns)).get(result)
+    if result_model is None:
+        abort(404)
+    return result_model
+
+
+@api.route("/validation/<result>")
+def validation_result(result):
+    result_model = get_result_or_404(
+        result, [getattr(ResultModel, c) for c in SUMMARY_COLUMNS]
+    )
+    summary = {
+        "id": str(result_model.id),
+        "valid": result_model.valid,
+        "error_count": result_model.error_count,
+        "row_count": result_model.row_count,
+        "valid_row_count": result_model.valid_row_count,
+        **(result_model.summary or {}),
+    }
+    fields = requested_fields(list(summary))
+    return jsonify({f: summary[f] for f in fields})
+
+
+@api.route("/validation/<result>/rows")
+def validation_rows(result):
+    fields = requested_fields(ROW_FIELDS, default=["row_number", "data"])
+    result_model = get_result_or_404(result, [ResultModel.id, ResultModel.row_headers])
+
+    limit = page_size()
+    after = request.args.get("after", 0, type=int)
+    loaded = {"row_number"} | set(fields) - {"errors"}
+    if {"data", "errors"} & set(fields):
+        # checked rows are kept as changes to their input
+        loaded |= {"input", "changes", "data"}
+    columns = [getattr(ResultRowModel, c) for c in loaded]
+    rows = (
+        ResultRowModel.query.with_entities(*columns)
+        .filter(ResultRowModel.result_id == result, ResultRowModel.row_number > after)
+        .order_by(ResultRowModel.row_number)
+        .limit(limit + 1)
+        .all()
+    )
+    rows, next_url = next_page(
+        rows, limit, lambda row: row.row_number, "api.validation_rows", result=result
+    )
+
+    data = {}
+    if "data" in loaded:
+        for row in rows:
+            data[row.row_number] = ResultRowModel.checked_row(
+                row.input, row.changes, row.data, result_model.row_headers
+            )
+    errors = {}
+    if "errors" in fields and rows:
+        first, last = rows[0].row_number, rows[-1].row_number
+        records = ResultModel.row_errors(result, first, last)
+        page = [data[row.row_number] for row in rows]
+        errors_by_row = ErrorsByRow(page, records, start=first)
+        for i, row in enumerate(rows):
+            errors[row.row_number] = errors_by_row[i]
+
+    derived = {"data": data, "errors": errors}
+
+    def field(row, f):
+        if f in derived:
+            return derived[f][row.row_number]
+        return getattr(row, f)
+
+    items = [{f: field(row, f) for f in fields} for row in rows]
+    return jsonify({"items": items, "next": next_url})
+
+
+@api.route("/validation/<result>/errors")
+def validation_errors(result):
+    fields = requested_fields(ERROR_FIELDS)
+    get_result_or_404(result, [ResultModel.id])
+
+    limit = page_size()
+    after = request.args.get("after", 0, type=int)
+    errors = ResultModel.report_errors(result, after=after, limit=limit + 1)
+    errors, next_url = next_page(
+        errors, limit, lambda e: e.n, "api.validation_errors", result=result
+    )
+    items = [{f: e.value[f] for f in fields if f in e.value} for e in errors]
+    return jsonify({"items": items, "next": next_url})
+
+
+def bounding_box():
+    """Returns the west, south, east and north edges given in the bbox
+    parameter, or None if there is no parameter.
+    """
+    bbox = request.args.get("bbox")
+    if not bbox:
+        return None
+    try:
+        west, south, east, north = (float(edge) for edge in bbox.split(","))
+    except ValueError:
+        abort(400, "bbox should be west,south,east,north in degrees")
+    return west, south, east, north
+
+
+def register_sites(result, key):
+    """Returns the sites in a result's register, which are worked out once
+    each time it is changed.
+    """
+    sites = site_cache.get(key)
+    if sites is None:
+        result_model = get_result_or_404(
+            result, [ResultModel.id, ResultModel.row_headers]
+        )
+        rows = result_model.iter_rows(batch_size=CSV_CHUNK_SIZE)
+        sites = Sites.from_rows((i, row) for i, (row, _) in enumerate(rows, start=1))
+        site_cache.set(key, sites)
+    return sites
+
+
+@api.route("/validation/<result>/geojson")
+def validation_geojson(result):
+    """The sites in a register as GeoJSON points, in WGS84. Given a bbox only
+    the sites inside it are returned, and given the zoom level of the map
+    they are to be shown on, sites that would be close together on the map
+    are returned as one cluster.
+    """
+    last_modified = ResultModel.last_modified(result)
+    if last_modified is None:
+        abort(404)
+    key = f"{result}-{last_modified:%Y%m%d%H%M%S%f}-geojson"
+    unchanged = not_modified(key, last_modified)
+    if unchanged is not None:
+        return unchanged
+
+    sites = register_sites(result, key)
+    bbox = bounding_box()
+    if bbox is not None:
+        sites = sites.within(*bbox)
+    cell_size = None
+    zoom = request.args.get("zoom", type=int)
+    if zoom is not None:
+        zoom = max(0, min(zoom, MAX_ZOOM))
+        cell_size = CLUSTER_PIXELS * 360 / (256 * 2**zoom)
+    collection = {"type": "FeatureCollection", "features": sites.features(cell_size)}
+    return set_validators(jsonify(collection), key, last_modified)
+
+
+@api.route("/validation/bulk", methods=["POST"])
+@csrf.exempt
+def validate_bulk_uploads():
+    files = request.files.getlist("upload")
+    if not files:
+        abort(400, "Send one or more files, or zip files, as upload")
+    try:
+        manifest = enqueue_bulk(read_bulk_uploads(files))
+    except zipfile.BadZipFile:
+        abort(400, "One of the zip files could not be read")
+    return jsonify({"results": manifest}), 202
+
+
+@api.errorhandler(400)
+@api.errorhandler(404)
+def json_error(error):
+    return jsonify({"error": error.description}), error.code
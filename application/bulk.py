@@ -0,0 +1,116 @@
+import os
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from flask import current_app, has_request_context, url_for
+from validator.utils import FileTypeException
+
+from application.extensions import db
+from application.frontend.models import ResultModel
+from application.jobs import enqueue_validation
+from application.utils import HashedUpload, read_upload, validate_path
+
+
+def read_bulk_uploads(files):
+    """Yields an upload for each register in the given files, taking each
+    file out of any zip files in turn.
+    """
+    for file_storage in files:
+        if not file_storage.filename.lower().endswith(".zip"):
+            yield read_upload(file_storage)
+            continue
+        with zipfile.ZipFile(file_storage.stream) as archive:
+            for info in archive.infolist():
+                name = os.path.basename(info.filename)
+                if info.is_dir() or name.startswith(".") or "__MACOSX" in info.filename:
+                    continue
+                with archive.open(info) as member:
+                    yield HashedUpload(name, member)
+
+
+def validate_bulk(uploads):
+    """Validates uploads across a pool of BULK_VALIDATION_WORKERS processes,
+    stores a result for each and returns a manifest entry for each.
+
+    At most two files per worker are in flight at once, so only those are
+    held on disk and in memory however many are sent.
+    """
+    workers = current_app.config["BULK_VALIDATION_WORKERS"]
+    manifest = []
+    pending = {}
+
+    def finish(done):
+        for future in done:
+            upload, entry = pending.pop(future)
+            try:
+                result = ResultModel(future.result(), fingerprint=upload.fingerprint)
+                db.session.add(result)
+                db.session.commit()
+                entry.update(manifest_entry(result))
+            except FileTypeException as e:
+                entry["error"] = f"{e}"
+            except Exception:
+                current_app.logger.exception(f"Bulk validation of {upload.filename}")
+                db.session.rollback()
+                entry["error"] = "There was a problem checking this file"
+            finally:
+                upload.close()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for upload in uploads:
+            entry = {"filename": upload.filename}
+            manifest.append(entry)
+            result_id = ResultModel.reuse(upload.fingerprint)
+            if result_id is not None:
+                db.session.commit()
+                upload.close()
+                entry.update(manifest_entry(ResultModel.query.get(result_id)))
+                continue
+            if len(pending) >= workers * 2:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                finish(done)
+            pending[executor.submit(validate_path, upload.path)] = (upload, entry)
+        finish(list(pending))
+    return manifest
+
+
+def enqueue_bulk(uploads):
+    """Queues a validation job for each upload, for the workers to check, and
+    returns a manifest entry for each. An upload that has been checked before
+    is given its result straight away.
+    """
+    manifest = []
+    for upload in uploads:
+        with upload:
+            entry = {"filename": upload.filename}
+            manifest.append(entry)
+            result_id = ResultModel.reuse(upload.fingerprint)
+            if result_id is not None:
+                db.session.commit()
+                entry.update(manifest_entry(ResultModel.query.get(result_id)))
+                continue
+            job = enqueue_validation(upload)
+            entry.update(
+                {
+                    "job": str(job.id),
+                    "status": job.status,
+                    "status_url": url_for(
+                        "frontend.validation_job_status", job=job.id, _external=True
+                    ),
+                }
+            )
+    return manifest
+
+
+def manifest_entry(result):
+    entry = {
+        "result": str(result.id),
+        "valid": result.valid,
+        "error_count": result.error_count,
+        "row_count": result.row_count,
+    }
+    if has_request_context():
+        entry["url"] = url_for(
+            "frontend.validation_result", result=result.id, _external=True
+        )
+    return entry
@@ -0,0 +1,88 @@
+import collections
+import threading
+
+from flask import current_app, request, session, Response
+from werkzeug.http import is_resource_modified
+
+
+class RenderCache:
+    """A bounded least recently used cache of rendered pages, kept in each
+    worker process. Pages are keyed by their ETag, so an edit to a result
+    makes its old page unreachable rather than needing to be cleared.
+
+    Anything else worked out from a result can be kept the same way, with
+    its size read from config_key.
+    """
+
+    def __init__(self, max_size=0, config_key="RENDER_CACHE_SIZE"):
+        self.max_size = max_size
+        self.config_key = config_key
+        self.pages = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_size = app.config.get(self.config_key, 0)
+
+    def get(self, key):
+        with self.lock:
+            page = self.pages.get(key)
+            if page is not None:
+                self.pages.move_to_end(key)
+            return page
+
+    def set(self, key, page):
+        if self.max_size <= 0:
+            return
+        with self.lock:
+            self.pages[key] = page
+            self.pages.move_to_end(key)
+            while len(self.pages) > self.max_size:
+                self.pages.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.pages.clear()
+
+
+def set_validators(response, etag, last_modified=None):
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # browsers may keep a copy but have to check it is current before using it
+    response.cache_control.no_cache = True
+    return response
+
+
+def not_modified(etag, last_modified=None):
+    """Returns a 304 response if the client already has the current version,
+    otherwise None.
+    """
+    if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        return None
+    return set_validators(Response(status=304), etag, last_modified)
+
+
+def shared_response(cache, etag, last_modified, render):
+    """Returns the page render gives, cached under its ETag for everyone who
+    asks for it. A page is only the same for everyone if rendering it left
+    the session alone, so one with anything from the session in it, such as
+    a csrf token or a flashed message, is sent to this session only.
+    """
+    page = cache.get(etag)
+    if page is None:
+        # getting the session marks it accessed, so that is cleared to see
+        # whether rendering used it; the view must not have used it before
+        current = session._get_current_object()
+        current.accessed = False
+        page = render()
+        if current.accessed:
+            current_app.logger.warning(f"Page {etag} used the session, not cached")
+            return private(Response(page))
+        cache.set(etag, page)
+    return set_validators(Response(page), etag, last_modified)
+
+
+def private(response):
+    response.cache_control.private = True
+    response.cache_control.no_store = True
+    return response
@@ -0,0 +1,57 @@
+import json
+import zlib
+
+from sqlalchemy.dialects.postgresql import BYTEA
+from sqlalchemy.types import TypeDecorator
+
+# every zlib stream starts with this byte and no json text does, so values
+# written at any level can be read back
+ZLIB_HEADER = b"\x78"
+
+
+class JSONCodec:
+    """Turns json values into bytes for storage and back again. Values are
+    zlib compressed at RESULT_ROW_COMPRESSION, or written as plain json text
+    when it is 0.
+    """
+
+    def __init__(self, level=1):
+        self.level = level
+
+    def init_app(self, app):
+        self.level = app.config.get("RESULT_ROW_COMPRESSION", self.level)
+
+    def encode(self, value):
+        data = json.dumps(value, separators=(",", ":")).encode("utf-8")
+        if self.level > 0:
+            data = zlib.compress(data, self.level)
+        return data
+
+    def decode(self, data):
+        data = bytes(data)
+        if data[:1] == ZLIB_HEADER:
+            data = zlib.decompress(data)
+        return json.loads(data)
+
+
+class EncodedJSON(TypeDecorator):
+    """A json value kept in a bytea column, encoded by the given codec. Use it
+    for json the database never has to look inside.
+    """
+
+    impl = BYTEA
+    cache_ok = True
+
+    def __init__(self, codec, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.codec = codec
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return self.codec.encode(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return self.codec.decode(value)
@@ -1 +1,91 @@
-# TODO create command to clear out validation reports after some time, 7 days perhaps?
+import datetime
+import json
+import os
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+
+@click.command("worker")
+@click.option("--poll-interval", default=1.0, help="Seconds to wait when idle")
+@click.option("--burst", is_flag=True, help="Exit once the queue is empty")
+@with_appcontext
+def worker(poll_interval, burst):
+    """Runs queued validation jobs."""
+    from application.jobs import work
+
+    processed = work(poll_interval=poll_interval, burst=burst)
+    click.echo(f"Processed {processed} validation jobs")
+
+
+@click.command("upload-stats")
+@with_appcontext
+def upload_stats():
+    """Shows how many uploads reused an earlier result."""
+    from application.frontend.models import ResultModel
+
+    uploads, hits = ResultModel.upload_stats()
+    click.echo(f"Uploads: {uploads}")
+    click.echo(f"Reused results: {hits}")
+    click.echo(f"Validated: {uploads - hits}")
+
+
+@click.command("purge-results")
+@click.option("--days", type=int, help="Keep results newer than this many days")
+@click.option("--batch-size", default=500, help="Results to delete per transaction")
+@with_appcontext
+def purge_results(days, batch_size):
+    """Deletes old validation results and finished jobs in small batches."""
+    from application.extensions import db
+    from application.frontend.models import ResultModel, ValidationJobModel
+
+    if days is None:
+        days = current_app.config["RESULT_RETENTION_DAYS"]
+    before = datetime.datetime.utcnow() - datetime.timedelta(days=days)
+
+    results = rows = edits = size = 0
+    while True:
+        purged, purged_rows, purged_edits, purged_size = ResultModel.purge(
+            before, batch_size
+        )
+        db.session.commit()
+        results += purged
+        rows += purged_rows
+        edits += purged_edits
+        size += purged_size
+        if purged < batch_size:
+            break
+
+    jobs = 0
+    while True:
+        purged = ValidationJobModel.purge(before, batch_size)
+        db.session.commit()
+        jobs += purged
+        if purged < batch_size:
+            break
+
+    click.echo(
+        f"Deleted {results} results with {rows} rows and {edits} edits, "
+        f"about {size} bytes"
+    )
+    click.echo(f"Deleted {jobs} validation jobs")
+
+
+@click.command("validate-bulk")
+@click.argument("paths", nargs=-1, required=True, type=click.Path(exists=True))
+@with_appcontext
+def validate_bulk_command(paths):
+    """Validates register files, or zip files of them, and prints a manifest."""
+    from werkzeug.datastructures import FileStorage
+    from application.bulk import read_bulk_uploads, validate_bulk
+
+    files = [
+        FileStorage(open(path, "rb"), filename=os.path.basename(path)) for path in paths
+    ]
+    try:
+        manifest = validate_bulk(read_bulk_uploads(files))
+    finally:
+        for f in files:
+            f.close()
+    click.echo(json.dumps({"results": manifest}, indent=2))
@@ -0,0 +1,120 @@
+import collections
+import json
+
+# the columns of a result an edit can change, besides its rows
+STATE_COLUMNS = [
+    "result",
+    "meta_data",
+    "errors",
+    "error_messages",
+    "summary",
+    "valid",
+    "error_count",
+    "row_count",
+    "valid_row_count",
+]
+
+
+def json_changes(before, after):
+    """Returns how one json value differs from another, or None if they are
+    the same. Dicts give the keys set to a new value and the keys taken out,
+    as rows.row_changes does, with the changes to a dict or list value worked
+    out the same way. Lists give the slices replaced, and the changes to
+    items changed in place, so a report with a few errors added or fixed
+    only records those errors.
+    """
+    if before == after:
+        return None
+    if isinstance(before, dict) and isinstance(after, dict):
+        changes = {}
+        cells = {}
+        for key, value in after.items():
+            if key in before:
+                change = json_changes(before[key], value)
+                if change is not None:
+                    cells[key] = change
+            else:
+                cells[key] = {"value": value}
+        if cells:
+            changes["set"] = cells
+        removed = [key for key in before if key not in after]
+        if removed:
+            changes["unset"] = removed
+        return changes
+    if isinstance(before, list) and isinstance(after, list):
+        splices = list_splices(before, after)
+        if len(json.dumps(splices)) < len(json.dumps(after)):
+            return {"splice": splices}
+    return {"value": after}
+
+
+def list_splices(before, after):
+    """Returns the splices that make one list from another, in order, as
+    [start, stop, items] for a slice of before replaced by items, or as
+    [index, changes] for an item changed in place.
+
+    The lists are walked once side by side. An item that is not in the rest
+    of the other list, when the item it is up against is, was taken out or
+    added. Otherwise the one item is taken as changed into the other.
+    This is not always the smallest set of splices, but it is linear, and
+    edits only ever take out, add or change errors without moving them.
+    """
+    b = [json.dumps(item, sort_keys=True) for item in before]
+    a = [json.dumps(item, sort_keys=True) for item in after]
+    b_left, a_left = collections.Counter(b), collections.Counter(a)
+    splices = []
+
+    def splice(start, stop, items):
+        last = splices[-1] if splices else None
+        if last is not None and len(last) == 3 and last[1] == start:
+            last[1] = stop
+            last[2].extend(items)
+        else:
+            splices.append([start, stop, list(items)])
+
+    i = j = 0
+    while i < len(b) or j < len(a):
+        if i < len(b) and j < len(a) and b[i] == a[j]:
+            pass
+        elif i < len(b) and (j == len(a) or not a_left[b[i]] and b_left[a[j]]):
+            splice(i, i + 1, [])
+            b_left[b[i]] -= 1
+            i += 1
+            continue
+        elif j < len(a) and (i == len(b) or not b_left[a[j]] and a_left[b[i]]):
+            splice(i, i, [after[j]])
+            a_left[a[j]] -= 1
+            j += 1
+            continue
+        else:
+            splices.append([i, json_changes(before[i], after[j])])
+        b_left[b[i]] -= 1
+        a_left[a[j]] -= 1
+        i += 1
+        j += 1
+    return splices
+
+
+def apply_json_changes(value, changes):
+    """Returns the value that json_changes was given as after, from the one
+    it was given as before and the changes it returned.
+    """
+    if "value" in changes:
+        return changes["value"]
+    if "splice" in changes:
+        value = list(value)
+        # later slices first, so the positions of earlier ones still hold
+        for splice in reversed(changes["splice"]):
+            if len(splice) == 2:
+                index, change = splice
+                value[index] = apply_json_changes(value[index], change)
+            else:
+                start, stop, items = splice
+                value[start:stop] = items
+        return value
+    value = dict(value)
+    for key in changes.get("unset", []):
+        value.pop(key, None)
+    for key, change in changes.get("set", {}).items():
+        value[key] = apply_json_changes(value.get(key), change)
+    return value
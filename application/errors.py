@@ -0,0 +1,85 @@
+from collections.abc import Sequence
+
+# each error is stored once, as a [row, column, message, fix, value] record
+ROW, COLUMN, MESSAGE, FIX, VALUE = range(5)
+
+
+def error_records(errors_by_column):
+    """Returns the errors in a Result's errors_by_column as records, in row
+    order.
+    """
+    records = [
+        [e["row"], column, e["message"], e["fix"], e["value"]]
+        for column, error in errors_by_column.items()
+        for e in error["errors"]
+    ]
+    records.sort(key=lambda record: record[ROW])
+    return records
+
+
+def error_messages(errors_by_column):
+    return {column: error["messages"] for column, error in errors_by_column.items()}
+
+
+def column_error(record):
+    return {
+        "message": record[MESSAGE],
+        "row": record[ROW],
+        "fix": record[FIX],
+        "value": record[VALUE],
+    }
+
+
+def group_by_column(records, messages):
+    """Returns errors_by_column, in the shape a Result gives it, from error
+    records and the messages for each column.
+    """
+    columns = {}
+    for record in records:
+        column = columns.get(record[COLUMN])
+        if column is None:
+            column = columns[record[COLUMN]] = {
+                "rows": [],
+                "errors": [],
+                "messages": messages.get(record[COLUMN], []),
+            }
+        if record[ROW] not in column["rows"][-1:]:
+            column["rows"].append(record[ROW])
+        column["errors"].append(column_error(record))
+    return columns
+
+
+class ErrorsByRow(Sequence):
+    """errors_by_row, in the shape a Result gives it, worked out a row at a
+    time from the rows and their error records, so a cell for every value
+    is only made for the rows that are looked at.
+
+    start is the number of the first of the rows, for a page of a register.
+    """
+
+    def __init__(self, rows, records, start=1):
+        self.rows = rows
+        self.start = start
+        self.records = {}
+        for record in records:
+            self.records.setdefault(record[ROW], []).append(record)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        number = self.start + index
+        cells = {
+            header: {"value": value, "error": None, "row": number}
+            for header, value in self.rows[index].items()
+        }
+        for record in self.records.get(number, []):
+            cell = cells.setdefault(
+                record[COLUMN], {"value": record[VALUE], "row": number}
+            )
+            cell["error"] = {"message": record[MESSAGE], "fix": record[FIX]}
+        return cells
@@ -7,7 +7,13 @@ from flask_misaka import Misaka
 from flask_migrate import Migrate
 from flask_wtf.csrf import CSRFProtect
 
+from application.caching import RenderCache
+from application.codecs import JSONCodec
+
 misaka = Misaka()
 db = SQLAlchemy()
 migrate = Migrate(db=db)
 csrf = CSRFProtect()
+render_cache = RenderCache()
+site_cache = RenderCache(config_key="SITE_CACHE_SIZE")
+row_codec = JSONCodec()
@@ -43,8 +43,10 @@ def register_errorhandlers(app):
 
 def register_blueprints(app):
     from application.frontend.views import frontend
+    from application.api.views import api
 
     app.register_blueprint(frontend)
+    app.register_blueprint(api)
 
 
 def register_extensions(app):
@@ -52,11 +54,17 @@ def register_extensions(app):
     from application.extensions import db
     from application.extensions import migrate
     from application.extensions import csrf
+    from application.extensions import render_cache
+    from application.extensions import site_cache
+    from application.extensions import row_codec
 
     misaka.init_app(app)
     db.init_app(app)
     migrate.init_app(app)
     csrf.init_app(app)
+    render_cache.init_app(app)
+    site_cache.init_app(app)
+    row_codec.init_app(app)
 
     if os.environ.get("FLASK_ENV") == "production":
         from flask_sslify import SSLify
@@ -65,7 +73,17 @@ def register_extensions(app):
 
 
 def register_commands(app):
-    pass
+    from application.commands import (
+        worker,
+        upload_stats,
+        purge_results,
+        validate_bulk_command,
+    )
+
+    app.cli.add_command(worker)
+    app.cli.add_command(upload_stats)
+    app.cli.add_command(purge_results)
+    app.cli.add_command(validate_bulk_command)
 
 
 def register_filters(app):
@@ -1,59 +1,758 @@
+import copy
+import json
 import uuid
 
-from sqlalchemy import func
-from sqlalchemy.dialects.postgresql import UUID, JSONB
+from flask import current_app
+from sqlalchemy import bindparam, func, literal, text
+from sqlalchemy.dialects.postgresql import UUID, JSONB, BYTEA
+from sqlalchemy.orm import defer
 from sqlalchemy.orm.attributes import flag_modified
-from application.extensions import db
+from application.codecs import EncodedJSON
+from application.edits import STATE_COLUMNS, apply_json_changes, json_changes
+from application.errors import (
+    ErrorsByRow,
+    column_error,
+    error_messages,
+    error_records,
+    group_by_column,
+)
+from application.extensions import db, row_codec
+from application.rows import ColumnarRows, apply_changes, base_row, row_changes
+from application.standards import get_standard
+
+brownfield = get_standard()
 
 
 class ResultModel(db.Model):
 
     id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     result = db.Column(JSONB, default=dict)
-    input = db.Column(JSONB, default=dict)
-    rows = db.Column(JSONB, default=dict)
-    errors_by_column = db.Column(JSONB, default=dict)
-    errors_by_row = db.Column(JSONB, default=list)
+    # every error in the register, see errors.error_records
+    errors = db.Column(JSONB, default=list)
+    error_messages = db.Column(JSONB, default=dict)
     meta_data = db.Column(JSONB, default=dict)
-    created_at = db.Column(db.DateTime(), nullable=False, server_default=func.now())
+    valid = db.Column(db.Boolean, nullable=True)
+    error_count = db.Column(db.Integer, nullable=True)
+    row_count = db.Column(db.Integer, nullable=True)
+    valid_row_count = db.Column(db.Integer, nullable=True)
+    summary = db.Column(JSONB, nullable=True)
+    # the headers each checked row takes from its input row
+    row_headers = db.Column(JSONB, nullable=True)
+    fingerprint = db.Column(db.String(), nullable=True, index=True)
+    cloned_from = db.Column(UUID(as_uuid=True), nullable=True)
+    created_at = db.Column(
+        db.DateTime(), nullable=False, server_default=func.now(), index=True
+    )
     updated_at = db.Column(db.DateTime(), nullable=True, onupdate=func.now())
+    # edits only save if no other edit has saved since they read the result
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+
+    # the number of the edit in the edit log the result is as of, see
+    # ResultEditModel
+    edit_number = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    __mapper_args__ = {"version_id_col": version}
 
-    def __init__(self, validation_result):
-        input = validation_result.input
-        rows = validation_result.rows
+    register_rows = db.relationship(
+        "ResultRowModel",
+        order_by="ResultRowModel.row_number",
+        lazy="dynamic",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+    edits = db.relationship(
+        "ResultEditModel",
+        order_by="ResultEditModel.number",
+        lazy="dynamic",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
+    def __init__(self, validation_result, fingerprint=None):
         result = validation_result.result
         meta_data = validation_result.meta_data
         errors_by_column = validation_result.errors_by_column
-        errors_by_row = validation_result.errors_by_row
         super(ResultModel, self).__init__(
             result=result,
-            input=input,
-            rows=rows,
             meta_data=meta_data,
-            errors_by_column=errors_by_column,
-            errors_by_row=errors_by_row,
+            errors=error_records(errors_by_column),
+            error_messages=error_messages(errors_by_column),
+            fingerprint=fingerprint,
+            row_headers=list(brownfield.headers),
         )
+        self.set_summary(validation_result)
+        for i, row in enumerate(validation_result.rows):
+            input = dict(validation_result.input[i])
+            self.register_rows.append(
+                ResultRowModel(
+                    row_number=i + 1,
+                    input=input,
+                    changes=row_changes(base_row(input, self.row_headers), row),
+                )
+            )
 
-    def to_dict(self):
+    @classmethod
+    def find_unedited(cls, fingerprint):
+        return (
+            cls.query.with_entities(cls.id)
+            .filter(
+                cls.fingerprint.isnot(None),
+                cls.fingerprint == fingerprint,
+                cls.updated_at.is_(None),
+            )
+            .order_by(cls.created_at.desc())
+            .first()
+        )
+
+    @classmethod
+    def clone(cls, result_id):
+        """Copies a result and its rows inside the database, so an identical
+        upload gets its own copy to edit without being validated again.
+        """
+        clone_id = uuid.uuid4()
+        id_type = UUID(as_uuid=True)
+        copied = [
+            c
+            for c in cls.__table__.columns
+            if c.name not in ["id", "cloned_from", "created_at", "updated_at"]
+        ]
+        results = db.session.query(
+            literal(clone_id, id_type), literal(result_id, id_type), *copied
+        ).filter(cls.id == result_id)
+        db.session.execute(
+            cls.__table__.insert().from_select(
+                ["id", "cloned_from"] + [c.name for c in copied], results.statement
+            )
+        )
+
+        rows = ResultRowModel.__table__
+        copied = [c for c in rows.columns if c.name != "result_id"]
+        register_rows = db.session.query(literal(clone_id, id_type), *copied).filter(
+            rows.c.result_id == result_id
+        )
+        db.session.execute(
+            rows.insert().from_select(
+                ["result_id"] + [c.name for c in copied], register_rows.statement
+            )
+        )
+        return clone_id
+
+    @classmethod
+    def reuse(cls, fingerprint):
+        """Returns the id of a fresh copy of an unedited result for the same
+        upload, or None if this upload has not been seen before.
+        """
+        if not fingerprint:
+            # jobs queued before uploads were fingerprinted
+            return None
+        existing = cls.find_unedited(fingerprint)
+        if existing is None:
+            current_app.logger.info(f"Upload {fingerprint} not seen before")
+            return None
+        current_app.logger.info(f"Upload {fingerprint} reusing result {existing.id}")
+        return cls.clone(existing.id)
+
+    @classmethod
+    def last_modified(cls, result_id):
+        """Returns when a result was last changed without loading any of it,
+        or None if there is no such result.
+        """
+        modified = (
+            cls.query.with_entities(func.coalesce(cls.updated_at, cls.created_at))
+            .filter(cls.id == result_id)
+            .first()
+        )
+        return modified[0] if modified is not None else None
+
+    @classmethod
+    def column_errors(cls, result_id, column, after=None, limit=100):
+        """Returns up to limit errors for one column, for rows after the given
+        row number, in row order. Paging by row number rather than offset keeps
+        each page as cheap as the first.
+        """
+        query = text(
+            """
+            SELECT e.value
+            FROM result_model r, jsonb_array_elements(r.errors) AS e
+            WHERE r.id = :id
+              AND e.value ->> 1 = :column
+              AND (CAST(:after AS integer) IS NULL
+                   OR (e.value ->> 0)::integer > :after)
+            ORDER BY (e.value ->> 0)::integer
+            LIMIT :limit
+            """
+        ).bindparams(bindparam("id", type_=UUID(as_uuid=True)))
+        params = {"id": result_id, "column": column, "after": after, "limit": limit}
+        records = db.session.execute(query, params).scalars()
+        return [column_error(record) for record in records]
+
+    @classmethod
+    def row_errors(cls, result_id, first, last):
+        """Returns the error records for rows first to last."""
+        query = text(
+            """
+            SELECT e.value
+            FROM result_model r, jsonb_array_elements(r.errors) AS e
+            WHERE r.id = :id AND (e.value ->> 0)::integer BETWEEN :first AND :last
+            """
+        ).bindparams(bindparam("id", type_=UUID(as_uuid=True)))
+        params = {"id": result_id, "first": first, "last": last}
+        return db.session.execute(query, params).scalars().all()
+
+    @classmethod
+    def report_errors(cls, result_id, after=0, limit=100):
+        """Returns up to limit (position, error) pairs from the report, for
+        errors after the given position, without loading the rest of it.
+        """
+        query = text(
+            """
+            SELECT e.n, e.value
+            FROM result_model r,
+                 jsonb_array_elements(r.result -> 'tables' -> 0 -> 'errors')
+                 WITH ORDINALITY AS e(value, n)
+            WHERE r.id = :id AND e.n > :after
+            ORDER BY e.n
+            LIMIT :limit
+            """
+        ).bindparams(bindparam("id", type_=UUID(as_uuid=True)))
+        params = {"id": result_id, "after": after, "limit": limit}
+        return db.session.execute(query, params).all()
+
+    @classmethod
+    def purge(cls, before, batch_size):
+        """Deletes up to batch_size results created before the given time, with
+        their rows and edit logs, and returns how many results, rows and edits
+        went and roughly how many bytes they took up.
+
+        Results another transaction has locked are skipped rather than waited
+        on, so a purge never holds up an edit.
+        """
+        query = text(
+            """
+            WITH doomed AS (
+                SELECT id FROM result_model
+                WHERE created_at < :before
+                ORDER BY created_at
+                LIMIT :batch_size
+                FOR UPDATE SKIP LOCKED
+            ), register_rows AS (
+                SELECT count(*) AS count, coalesce(sum(pg_column_size(r.*)), 0) AS size
+                FROM result_row_model r JOIN doomed d ON r.result_id = d.id
+            ), edits AS (
+                SELECT count(*) AS count, coalesce(sum(pg_column_size(e.*)), 0) AS size
+                FROM result_edit_model e JOIN doomed d ON e.result_id = d.id
+            ), deleted AS (
+                DELETE FROM result_model m USING doomed d
+                WHERE m.id = d.id
+                RETURNING pg_column_size(m.*) AS size
+            )
+            SELECT
+                (SELECT count(*) FROM deleted),
+                (SELECT count FROM register_rows),
+                (SELECT count FROM edits),
+                (SELECT coalesce(sum(size), 0) FROM deleted)
+                    + (SELECT size FROM register_rows)
+                    + (SELECT size FROM edits)
+            """
+        )
+        params = {"before": before, "batch_size": batch_size}
+        return tuple(db.session.execute(query, params).one())
+
+    @classmethod
+    def upload_stats(cls):
+        uploads = func.count(cls.id)
+        hits = func.count(cls.cloned_from)
+        return db.session.query(uploads, hits).filter(cls.fingerprint.isnot(None)).one()
+
+    @property
+    def input(self):
+        return [dict(row.input) for row in self.register_rows]
+
+    @property
+    def rows(self):
+        return [row.get_data(self.row_headers) for row in self.register_rows]
+
+    @property
+    def errors_by_row(self):
+        return list(ErrorsByRow(self.rows, self.errors))
+
+    @property
+    def errors_by_column(self):
+        return group_by_column(self.errors, self.error_messages)
+
+    def set_summary(self, validation_result):
+        counts = {
+            "valid": validation_result.valid(),
+            "error_count": validation_result.error_count(),
+            "row_count": validation_result.row_count(),
+            "valid_row_count": validation_result.valid_row_count(),
+        }
+        for column, value in counts.items():
+            if getattr(self, column) != value:
+                setattr(self, column, value)
+        summary = {
+            "file_type": validation_result.file_type(),
+            "planning_authority": validation_result.planning_authority(),
+            "headers_check": validation_result.check_headers(),
+            "headers_found": validation_result.headers_found(),
+            "missing_headers": validation_result.missing_headers(),
+            "additional_headers": validation_result.additional_headers(),
+            "deprecated_headers_found": validation_result.deprecated_headers_found(),
+            "extra_headers_found": validation_result.extra_headers_found(),
+            "column_errors": {
+                column: {
+                    "messages": error["messages"],
+                    "error_count": len(error["errors"]),
+                    "row_count": len(error["rows"]),
+                    "fixable": any(e["fix"] for e in error["errors"]),
+                }
+                for column, error in validation_result.errors_by_column.items()
+            },
+        }
+        if summary != self.summary:
+            self.summary = summary
+
+    def has_summary(self):
+        return self.summary is not None and "column_errors" in self.summary
+
+    def first_column_errors(self, limit):
+        """Returns up to limit errors for each column. The errors are picked out
+        by the database, so the whole of the errors are never loaded.
+        """
+        query = text(
+            """
+            SELECT c.column, jsonb_agg(c.value ORDER BY c.n)
+            FROM (
+                SELECT e.value ->> 1 AS column, e.value, e.n,
+                       row_number() OVER (
+                           PARTITION BY e.value ->> 1 ORDER BY e.n
+                       ) AS k
+                FROM result_model r,
+                     jsonb_array_elements(r.errors) WITH ORDINALITY AS e(value, n)
+                WHERE r.id = :id
+            ) AS c
+            WHERE c.k <= :limit
+            GROUP BY c.column
+            """
+        ).bindparams(bindparam("id", type_=UUID(as_uuid=True)))
+        columns = db.session.execute(query, {"id": self.id, "limit": limit}).all()
+        return {
+            column: [column_error(record) for record in records]
+            for column, records in columns
+        }
+
+    def iter_rows(self, batch_size=1000):
+        query = ResultRowModel.query.filter_by(result_id=self.id).order_by(
+            ResultRowModel.row_number
+        )
+        for row in query.yield_per(batch_size):
+            yield row.get_data(self.row_headers), row.input
+
+    def to_dict(self, columnar=False):
+        """Returns the result as the arguments to a Result. With columnar the
+        input and rows are ColumnarRows, which take far less memory for a big
+        register but are not json.
+        """
+        if columnar:
+            input, rows = ColumnarRows(), ColumnarRows()
+            for row in self.register_rows:
+                input.append(row.input)
+                rows.append(row.get_data(self.row_headers))
+            errors_by_row = ErrorsByRow(rows, self.errors)
+        else:
+            register_rows = self.register_rows.all()
+            input = [dict(row.input) for row in register_rows]
+            rows = [row.get_data(self.row_headers) for row in register_rows]
+            errors_by_row = list(ErrorsByRow(rows, self.errors))
         return {
             "id": str(self.id),
-            "result": self.result,
-            "input": self.input,
-            "rows": self.rows,
-            "meta_data": self.meta_data,
-            "errors_by_row": self.errors_by_row,
+            # copies, so edits made in place are seen as changes by update
+            "result": copy.deepcopy(self.result),
+            "input": input,
+            "rows": rows,
+            "meta_data": copy.deepcopy(self.meta_data),
+            "errors_by_row": errors_by_row,
             "errors_by_column": self.errors_by_column,
         }
 
-    def update(self, validation_result):
-        self.result = validation_result.result
-        self.rows = validation_result.rows
-        self.meta_data = validation_result.meta_data
-        self.errors_by_column = validation_result.errors_by_column
-        self.errors_by_row = validation_result.errors_by_row
-
-        flag_modified(self, "result")
-        flag_modified(self, "rows")
-        flag_modified(self, "meta_data")
-        flag_modified(self, "errors_by_column")
-        flag_modified(self, "errors_by_row")
+    def has_edit(self, number):
+        return db.session.query(self.edits.filter_by(number=number).exists()).scalar()
+
+    def undo(self):
+        """Puts the result back as it was before its last edit, and returns
+        False if it has no edits to undo.
+        """
+        if self.edit_number == 0:
+            return False
+        self.restore(self.edit_number - 1)
+        return True
+
+    def redo(self):
+        """Makes the last edit undone again, and returns False if there is no
+        undone edit.
+        """
+        if not self.has_edit(self.edit_number + 1):
+            return False
+        self.restore(self.edit_number + 1)
+        return True
+
+    def restore(self, number):
+        """Puts the result back as it was after the given edit in its edit
+        log, without checking any of the register again.
+
+        Going forward the edits are made again on the result as it is. Going
+        back the result is rebuilt from the last snapshot at or before the
+        edit and the edits made since, and only the rows changed since that
+        snapshot are written.
+        """
+        if number > self.edit_number:
+            start, state, rows = self.edit_number, self.state(), {}
+        else:
+            snapshot = (
+                self.edits.filter(
+                    ResultEditModel.number <= number,
+                    ResultEditModel.snapshot.isnot(None),
+                )
+                .order_by(ResultEditModel.number.desc())
+                .first()
+            )
+            start = snapshot.number
+            state = snapshot.snapshot["state"]
+            rows = dict(snapshot.snapshot["rows"])
+        edits = self.edits.options(defer(ResultEditModel.snapshot)).filter(
+            ResultEditModel.number > start,
+            ResultEditModel.number <= max(number, self.edit_number),
+        )
+        changed = set()
+        for edit in edits:
+            changed.update(row_number for row_number, _ in edit.rows)
+            if edit.number <= number:
+                state = apply_json_changes(state, edit.state)
+                rows.update(edit.rows)
+
+        written = sum(self.write_if_changed(c, v) for c, v in state.items())
+        register_rows = self.register_rows.filter(
+            ResultRowModel.row_number.in_(changed)
+        )
+        for row in register_rows:
+            written += row.set_changes(rows.get(row.row_number, {}))
+        self.updated_at = func.now()
+        self.edit_number = number
+        current_app.logger.info(
+            f"Result {self.id} restored to edit {number}, {written} bytes written, "
+            f"{len(changed)} rows changed"
+        )
+
+    def write_if_changed(self, column, value):
+        """Sets a json column only if its value has changed, and returns how
+        many bytes of json that writes.
+        """
+        if getattr(self, column) == value:
+            return 0
+        setattr(self, column, value)
+        flag_modified(self, column)
+        return len(json.dumps(value))
+
+    def state(self):
+        return {column: getattr(self, column) for column in STATE_COLUMNS}
+
+    def update(self, validation_result, columns=None, headers=None):
+        """Writes back only the columns and rows an edit has changed, and adds
+        what it changed to the edit log. columns are the columns the edit was
+        made to and headers any header changes it made.
+        """
+        # the queries for rows and edits would otherwise flush the edit part
+        # way through, writing the result's own row twice
+        with db.session.no_autoflush:
+            before = self.state()
+            errors_by_column = validation_result.errors_by_column
+            written = {
+                "result": self.write_if_changed("result", validation_result.result),
+                "meta_data": self.write_if_changed(
+                    "meta_data", validation_result.meta_data
+                ),
+                "errors": self.write_if_changed(
+                    "errors", error_records(errors_by_column)
+                ),
+                "error_messages": self.write_if_changed(
+                    "error_messages", error_messages(errors_by_column)
+                ),
+            }
+            self.set_summary(validation_result)
+
+            if self.row_headers is None:
+                # rows stored in full, before rows were kept as their changes,
+                # are changed over as they are written
+                self.row_headers = list(brownfield.headers)
+            number = self.edit_number + 1
+            # the result as it was checked is kept the first time it is edited
+            original = self.edit_number == 0 and not self.has_edit(0)
+            snapshot = number % current_app.config["RESULT_SNAPSHOT_INTERVAL"] == 0
+            rows, original_rows, changed_rows, snapshot_rows = [], [], [], []
+            for row in self.register_rows:
+                if original:
+                    original_rows.append(
+                        [row.row_number, row.get_changes(self.row_headers)]
+                    )
+                written_row = row.update(
+                    self.row_headers, validation_result.rows[row.row_number - 1]
+                )
+                rows.append(written_row)
+                if written_row:
+                    changed_rows.append([row.row_number, row.changes])
+                if snapshot:
+                    snapshot_rows.append([row.row_number, row.changes])
+            written["rows"] = sum(rows)
+            if any(written.values()):
+                # pages are cached against updated_at, which is otherwise only
+                # set when the result's own row is written
+                self.updated_at = func.now()
+                if original:
+                    snapshot_0 = ResultEditModel.snapshot_of(before, original_rows)
+                    self.edits.append(ResultEditModel(number=0, snapshot=snapshot_0))
+                # edits that were undone can no longer be redone
+                ResultEditModel.query.filter(
+                    ResultEditModel.result_id == self.id,
+                    ResultEditModel.number >= number,
+                ).delete()
+                edit = ResultEditModel(
+                    number=number,
+                    columns=columns or [],
+                    headers=headers,
+                    rows=changed_rows,
+                    state=json_changes(before, self.state()) or {},
+                )
+                if snapshot:
+                    edit.snapshot = ResultEditModel.snapshot_of(
+                        self.state(), snapshot_rows
+                    )
+                self.edits.append(edit)
+                self.edit_number = number
+
+        changed = ", ".join(f"{c} {n}" for c, n in written.items() if n)
+        current_app.logger.info(
+            f"Result {self.id} updated, {sum(written.values())} bytes written "
+            f"({changed or 'no changes'}), {len([n for n in rows if n])} rows changed"
+        )
+
+
+class ResultRowModel(db.Model):
+
+    result_id = db.Column(
+        UUID(as_uuid=True),
+        db.ForeignKey("result_model.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    row_number = db.Column(db.Integer, primary_key=True)
+    input = db.Column(EncodedJSON(row_codec), default=dict)
+    # the checked row, for rows stored before they were kept as changes
+    data = db.Column(EncodedJSON(row_codec), nullable=True)
+    # how the checked row differs from its input, see rows.row_changes
+    changes = db.Column(EncodedJSON(row_codec), nullable=True)
+
+    @staticmethod
+    def checked_row(input, changes, data, headers):
+        if data is not None:
+            return dict(data)
+        return apply_changes(base_row(input, headers), changes or {})
+
+    def get_data(self, headers):
+        return self.checked_row(self.input, self.changes, self.data, headers)
+
+    def get_changes(self, headers):
+        if self.data is not None:
+            return row_changes(base_row(self.input, headers), self.data)
+        return self.changes or {}
+
+    def update(self, headers, data):
+        """Writes back the row if it has changed, and returns how many bytes
+        that writes.
+        """
+        return self.set_changes(row_changes(base_row(self.input, headers), data))
+
+    def set_changes(self, changes):
+        if self.data is None and changes == self.changes:
+            return 0
+        self.data = None
+        self.changes = changes
+        return len(row_codec.encode(changes))
+
+
+class ResultEditModel(db.Model):
+    """An edit made to a result, kept as what it changed rather than the
+    result it made, so any edit can be undone without checking the register
+    again.
+
+    Every RESULT_SNAPSHOT_INTERVAL edits the whole of the result after the
+    edit is kept as well, so rebuilding a result only ever means replaying
+    the few edits after a snapshot. Edit 0 is a snapshot of the result as it
+    was checked.
+    """
+
+    result_id = db.Column(
+        UUID(as_uuid=True),
+        db.ForeignKey("result_model.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    number = db.Column(db.Integer, primary_key=True)
+    # the columns the edit was made to, and any header changes it made
+    columns = db.Column(JSONB, default=list)
+    headers = db.Column(JSONB, nullable=True)
+    # [row number, changes] for each row it changed, see rows.row_changes
+    rows = db.Column(EncodedJSON(row_codec), default=list)
+    # how it changed the rest of the result, see edits.json_changes
+    state = db.Column(EncodedJSON(row_codec), default=dict)
+    snapshot = db.Column(EncodedJSON(row_codec), nullable=True)
+    created_at = db.Column(db.DateTime(), nullable=False, server_default=func.now())
+
+    @staticmethod
+    def snapshot_of(state, rows):
+        # rows with no changes are the same as their input, so are left out
+        rows = [[row_number, changes] for row_number, changes in rows if changes]
+        return {"state": state, "rows": rows}
+
+
+class ValidationJobModel(db.Model):
+
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETE = "complete"
+    FAILED = "failed"
+
+    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    status = db.Column(db.String(), nullable=False, default=PENDING, index=True)
+    filename = db.Column(db.String(), nullable=False)
+    fingerprint = db.Column(db.String(), nullable=True)
+    upload = db.Column(BYTEA, nullable=True)
+    result_id = db.Column(
+        UUID(as_uuid=True),
+        db.ForeignKey("result_model.id", ondelete="SET NULL"),
+        nullable=True,
+    )
+    message = db.Column(db.String(), nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    created_at = db.Column(db.DateTime(), nullable=False, server_default=func.now())
+    started_at = db.Column(db.DateTime(), nullable=True)
+    heartbeat_at = db.Column(db.DateTime(), nullable=True)
+    finished_at = db.Column(db.DateTime(), nullable=True)
+
+    @classmethod
+    def purge(cls, before, batch_size):
+        """Deletes up to batch_size finished jobs created before the given time
+        and returns how many went.
+        """
+        finished = (
+            db.session.query(cls.id)
+            .filter(
+                cls.created_at < before,
+                cls.status.in_([cls.COMPLETE, cls.FAILED]),
+            )
+            .order_by(cls.created_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        return cls.query.filter(cls.id.in_(finished.scalar_subquery())).delete(
+            synchronize_session=False
+        )
+
+    def to_dict(self):
+        return {
+            "id": str(self.id),
+            "status": self.status,
+            "result": str(self.result_id) if self.result_id else None,
+            "message": self.message,
+        }
+
+
+class ResultView:
+    """A read only view of a stored result for the pages that show it. It
+    gives the parts of the Result api the templates use from the summary
+    stored on a ResultModel, so the register itself is never loaded.
+
+    Anything that costs a query is worked out the first time it is asked for
+    and kept for the rest of the request.
+    """
+
+    __slots__ = ("model", "id", "standard", "errors_per_column", "_errors_by_column")
+
+    def __init__(self, result_model, standard, errors_per_column=10):
+        self.model = result_model
+        self.id = result_model.id
+        self.standard = standard
+        self.errors_per_column = errors_per_column
+        self._errors_by_column = None
+
+    def valid(self):
+        return self.model.valid
+
+    def error_count(self):
+        return self.model.error_count
+
+    def row_count(self):
+        return self.model.row_count
+
+    def valid_row_count(self):
+        return self.model.valid_row_count
+
+    def file_type(self):
+        return self.model.summary["file_type"]
+
+    def planning_authority(self):
+        return self.model.summary["planning_authority"]
+
+    def check_headers(self):
+        return self.model.summary["headers_check"]
+
+    def headers_found(self):
+        return self.model.summary["headers_found"]
+
+    def missing_headers(self):
+        return self.model.summary["missing_headers"]
+
+    def additional_headers(self):
+        return self.model.summary["additional_headers"]
+
+    def deprecated_headers_found(self):
+        return self.model.summary["deprecated_headers_found"]
+
+    def extra_headers_found(self):
+        return self.model.summary["extra_headers_found"]
+
+    def column_error(self, column):
+        """Returns the stored counts and messages for a column, or None if it
+        has no errors.
+        """
+        return self.model.summary["column_errors"].get(column)
+
+    def can_undo(self):
+        return self.model.edit_number > 0
+
+    def can_redo(self):
+        return self.model.has_edit(self.model.edit_number + 1)
+
+    def fixable_columns(self):
+        column_errors = self.model.summary["column_errors"]
+        return [column for column, error in column_errors.items() if error["fixable"]]
+
+    @property
+    def errors_by_column(self):
+        """The stored counts and messages for each column with errors, and
+        the first errors_per_column of its errors.
+        """
+        if self._errors_by_column is None:
+            column_errors = self.model.summary["column_errors"]
+            first_errors = {}
+            if column_errors:
+                first_errors = self.model.first_column_errors(self.errors_per_column)
+            self._errors_by_column = {
+                column: dict(error, errors=first_errors.get(column, []))
+                for column, error in column_errors.items()
+            }
+        return self._errors_by_column
+
+    @property
+    def result(self):
+        return self.model.result
+
+    def to_dict(self):
+        return self.model.to_dict()
@@ -1,6 +1,3 @@
-import csv
-import io
-
 from flask import (
     Blueprint,
     render_template,
@@ -9,25 +6,43 @@ from flask import (
     url_for,
     abort,
     request,
-    make_response,
+    current_app,
+    Response,
+    stream_with_context,
 )
-from validator.standards import BrownfieldStandard
 from validator.utils import FileTypeException
 from validator.validation_result import Result
+from sqlalchemy.orm import defer
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy.orm.attributes import flag_modified
 from werkzeug.utils import redirect
 
-from application.extensions import db
+from application.caching import not_modified, set_validators, shared_response
+from application.extensions import db, render_cache
 from application.frontend.forms import UploadForm
-from application.frontend.models import ResultModel
+from application.frontend.models import (
+    ResultModel,
+    ResultView,
+    ValidationJobModel,
+)
+from application.jobs import enqueue_validation
 from application.utils import (
+    EditConflictException,
     InvalidEditException,
+    apply_all_fixes,
     compile_header_edits,
-    write_tempfile_and_validate,
+    read_upload,
+    validate_upload,
     update_and_save_headers,
     revalidate_result,
+    generate_csv,
+    CSV_CHUNK_SIZE,
 )
+from application.standards import get_standard
+
+brownfield = get_standard()
 
-brownfield_standard = BrownfieldStandard()
+ERRORS_PER_PAGE = 100
 
 frontend = Blueprint("frontend", __name__, template_folder="templates")
 
@@ -46,120 +61,325 @@ def google_verification():
 def validate():
     form = UploadForm()
     if form.validate_on_submit():
-        try:
-            res = write_tempfile_and_validate(form)
-            result = ResultModel(res)
-            db.session.add(result)
-            db.session.commit()
-            return redirect(url_for("frontend.validation_result", result=result.id))
-        except FileTypeException as e:
-            flash(f"{e}", category="error")
+        with read_upload(form.upload.data) as upload:
+            result_id = ResultModel.reuse(upload.fingerprint)
+            if result_id is not None:
+                db.session.commit()
+                return redirect(url_for("frontend.validation_result", result=result_id))
+            if current_app.config["ASYNC_VALIDATION"]:
+                job = enqueue_validation(upload)
+                return redirect(url_for("frontend.validation_job", job=job.id))
+            try:
+                res = validate_upload(upload)
+                result = ResultModel(res, fingerprint=upload.fingerprint)
+                db.session.add(result)
+                db.session.commit()
+                return redirect(url_for("frontend.validation_result", result=result.id))
+            except FileTypeException as e:
+                flash(f"{e}", category="error")
 
     return render_template("upload.html", form=form)
 
 
+@frontend.route("/validation/job/<job>")
+def validation_job(job):
+    job = ValidationJobModel.query.options(defer(ValidationJobModel.upload)).get(job)
+    if job is None:
+        abort(404)
+    if job.status == ValidationJobModel.COMPLETE:
+        if job.result_id is None:
+            # the result has since been removed
+            message = "The results for this file have expired, please check it again"
+            flash(message, category="error")
+            return redirect(url_for("frontend.validate"))
+        return redirect(url_for("frontend.validation_result", result=job.result_id))
+    if job.status == ValidationJobModel.FAILED:
+        flash(job.message, category="error")
+        return redirect(url_for("frontend.validate"))
+    return render_template("validation-job.html", job=job)
+
+
+@frontend.route("/validation/job/<job>/status")
+def validation_job_status(job):
+    job = ValidationJobModel.query.options(defer(ValidationJobModel.upload)).get(job)
+    if job is None:
+        abort(404)
+    return jsonify(job.to_dict())
+
+
+def result_etag(result_id, last_modified):
+    # pages are rendered against the standard as well as the result
+    return f"{result_id}-{last_modified:%Y%m%d%H%M%S%f}-{brownfield.version}"
+
+
 @frontend.route("/validation/<result>")
 def validation_result(result):
-    db_result = ResultModel.query.get(result)
-    if db_result is not None:
-        result = Result(**db_result.to_dict(), standard=brownfield_standard)
-        updated_at = db_result.updated_at
-        return render_template(
-            "validation-result.html", result=result, register_updated_at=updated_at
+    last_modified = ResultModel.last_modified(result)
+    if last_modified is None:
+        abort(404)
+    etag = result_etag(result, last_modified)
+    unchanged = not_modified(etag, last_modified)
+    if unchanged is not None:
+        return unchanged
+
+    return shared_response(
+        render_cache, etag, last_modified, lambda: render_result(result)
+    )
+
+
+def get_result_view(result):
+    """Returns a ResultView of a stored result, without loading its report or
+    register, or aborts with a 404 if there is no such result.
+    """
+    db_result = ResultModel.query.options(
+        defer(ResultModel.result), defer(ResultModel.errors)
+    ).get(result)
+    if db_result is None:
+        abort(404)
+    if not db_result.has_summary():
+        # results saved before summaries were stored get one on first view
+        full_result = Result(
+            **db_result.to_dict(columnar=True), standard=brownfield.standard
         )
-    abort(404)
+        db_result.set_summary(full_result)
+        # writing the summary is not an edit, so keep updated_at as it was
+        flag_modified(db_result, "updated_at")
+        db.session.add(db_result)
+        db.session.commit()
+    return ResultView(db_result, brownfield.standard)
+
+
+def render_result(result):
+    # the page is shared by everyone who views the result, so it must not
+    # use the session, see shared_response
+    result = get_result_view(result)
+    updated_at = result.model.updated_at
+    return render_template(
+        "validation-result.html", result=result, register_updated_at=updated_at
+    )
+
+
+@frontend.route("/validation/<result>/errors/<column>")
+def column_errors(result, column):
+    last_modified = ResultModel.last_modified(result)
+    if last_modified is None:
+        abort(404)
+    etag = result_etag(result, last_modified)
+    unchanged = not_modified(etag, last_modified)
+    if unchanged is not None:
+        return unchanged
+
+    after = request.args.get("after", type=int)
+    errors = ResultModel.column_errors(
+        result, column, after=after, limit=ERRORS_PER_PAGE + 1
+    )
+    next_after = None
+    if len(errors) > ERRORS_PER_PAGE:
+        errors = errors[:ERRORS_PER_PAGE]
+        next_after = errors[-1]["row"]
+    page = render_template(
+        "column-errors.html",
+        result_id=result,
+        column=column,
+        errors=errors,
+        next_after=next_after,
+    )
+    return set_validators(Response(page), etag, last_modified)
 
 
 @frontend.route("/schema")
 def schema():
-    return jsonify(brownfield_standard.current_standard_headers())
+    unchanged = not_modified(brownfield.version)
+    if unchanged is not None:
+        return unchanged
+    response = jsonify(brownfield.headers)
+    return set_validators(response, brownfield.version)
+
+
+def save_edit(result_view, edit):
+    """Makes an edit to a result and saves it, and returns what the edit
+    returns. edit is given a ResultView and makes its change on the view's
+    model.
+
+    Nothing is locked while the edit is made. If another edit saves first
+    the result's version will have moved on, so the edit is made again on
+    the saved result, up to RESULT_EDIT_ATTEMPTS times in all.
+    """
+    result_id = result_view.id
+    for attempt in range(current_app.config["RESULT_EDIT_ATTEMPTS"]):
+        if attempt:
+            result_view = get_result_view(result_id)
+        try:
+            # the session can flush while the edit is being made, so a
+            # conflict can show before the commit
+            outcome = edit(result_view)
+            db.session.commit()
+            return outcome
+        except StaleDataError:
+            db.session.rollback()
+            current_app.logger.info(f"Result {result_id} was edited at the same time")
+    raise EditConflictException(result_id)
+
+
+def full_result(result_view):
+    # only an edit needs the whole register
+    db_result = result_view.model
+    return Result(**db_result.to_dict(columnar=True), standard=brownfield.standard)
+
+
+def sorted_headers(headers):
+    return sorted(headers, key=lambda v: (v.upper(), v[0].islower()))
 
 
 @frontend.route("/validation/<result>/edit/headers", methods=["GET", "POST"])
 def edit_headers(result):
-    db_result = ResultModel.query.get(result)
-    if db_result is not None:
-        result = Result(**db_result.to_dict(), standard=brownfield_standard)
-        if request.method == "POST":
-            original_additional_headers = sorted(
-                result.extra_headers_found(), key=lambda v: (v.upper(), v[0].islower())
+    result_view = get_result_view(result)
+    if request.method == "POST":
+        original_additional_headers = sorted_headers(result_view.extra_headers_found())
+        try:
+            header_edits, new_headers = compile_header_edits(
+                request.form, original_additional_headers
             )
-            try:
-                header_edits, new_headers = compile_header_edits(
-                    request.form, original_additional_headers
-                )
-            except InvalidEditException as e:
-                return render_template(
-                    "edit-headers.html", result=result, invalid_edits=e.invalid_edits
-                )
-            update = update_and_save_headers(result, header_edits, new_headers)
-            result = revalidate_result(result, brownfield_standard)
-            db_result.update(result)
-            db.session.add(db_result)
-            db.session.commit()
+        except InvalidEditException as e:
             return render_template(
-                "edit-confirmation.html",
-                result=update["result"],
-                updated_headers=update["headers_added"],
-                removed_headers=update["headers_removed"],
-                header_changes=update["header_changes"],
+                "edit-headers.html", result=result_view, invalid_edits=e.invalid_edits
+            )
+
+        def edit(result_view):
+            # the edits are to headers by position, so only hold while the
+            # headers are the ones the form was filled in against
+            headers = sorted_headers(result_view.extra_headers_found())
+            if headers != original_additional_headers:
+                raise EditConflictException(result_view.id)
+            result = full_result(result_view)
+            update = update_and_save_headers(result, header_edits, new_headers)
+            result = revalidate_result(
+                result, brownfield.standard, columns=update["headers_added"]
+            )
+            result_view.model.update(
+                result,
+                columns=update["headers_added"],
+                headers=update["header_changes"],
             )
+            return update
 
-    return render_template("edit-headers.html", result=result)
+        update = save_edit(result_view, edit)
+        return render_template(
+            "edit-confirmation.html",
+            result=update["result"],
+            updated_headers=update["headers_added"],
+            removed_headers=update["headers_removed"],
+            header_changes=update["header_changes"],
+        )
+
+    return render_template("edit-headers.html", result=result_view)
+
+
+def can_fix(column):
+    # fixes are only suggested for dates in the wrong format
+    return "Date" in column
 
 
 @frontend.route("/validation/<result>/edit/column/<column>")
 def edit_column(result, column):
-    db_result = ResultModel.query.get(result)
-    if db_result is not None:
-        result = Result(**db_result.to_dict(), standard=brownfield_standard)
-        if "Date" not in column or result.errors_by_column.get(column) is None:
-            # colm, if they get the page again there will be not errors_by_column for this
-            # column if we've re-validated
-            return render_template(
-                "edit-column-confirmation.html", column=column, result=result
-            )
+    result_view = get_result_view(result)
+    if not can_fix(column) or result_view.column_error(column) is None:
+        # colm, if they get the page again there will be not errors_by_column for this
+        # column if we've re-validated
+        return render_template(
+            "edit-column-confirmation.html", column=column, result=result_view
+        )
 
+    def edit(result_view):
+        result = full_result(result_view)
         fixes_applied = result.apply_fixes(column)
-        result = revalidate_result(result, brownfield_standard)
-        db_result.update(result)
-        db.session.add(db_result)
-        db.session.commit()
+        result = revalidate_result(result, brownfield.standard, columns=[column])
+        result_view.model.update(result, columns=[column])
+        return result, fixes_applied
+
+    result, fixes_applied = save_edit(result_view, edit)
+    return render_template(
+        "edit-column-confirmation.html",
+        column=column,
+        result=result,
+        fixes_applied=fixes_applied,
+        edited=True,
+    )
+
+
+@frontend.route("/validation/<result>/edit/fixes", methods=["GET", "POST"])
+def edit_all_fixes(result):
+    result_view = get_result_view(result)
+    columns = [c for c in result_view.fixable_columns() if can_fix(c)]
+    if not columns:
         return render_template(
-            "edit-column-confirmation.html",
-            column=column,
-            result=result,
-            fixes_applied=fixes_applied,
-            edited=True,
+            "edit-fixes-confirmation.html", result=result_view, fixes_applied={}
         )
+    if request.method != "POST":
+        return render_template("edit-fixes.html", result=result_view, columns=columns)
+
+    def edit(result_view):
+        # every column is fixed, checked and saved together
+        result = full_result(result_view)
+        fixes_applied = apply_all_fixes(result, columns)
+        result = revalidate_result(result, brownfield.standard, columns=columns)
+        result_view.model.update(result, columns=columns)
+        return result, fixes_applied
+
+    result, fixes_applied = save_edit(result_view, edit)
+    return render_template(
+        "edit-fixes-confirmation.html", result=result, fixes_applied=fixes_applied
+    )
+
+
+@frontend.route("/validation/<result>/edit/undo", methods=["GET", "POST"])
+def undo_edit(result):
+    result_view = get_result_view(result)
+    if request.method == "POST":
+        save_edit(result_view, lambda result_view: result_view.model.undo())
+    elif result_view.can_undo():
+        return render_template("edit-history.html", result=result_view, undo=True)
+    return redirect(url_for("frontend.validation_result", result=result))
+
+
+@frontend.route("/validation/<result>/edit/redo", methods=["GET", "POST"])
+def redo_edit(result):
+    result_view = get_result_view(result)
+    if request.method == "POST":
+        save_edit(result_view, lambda result_view: result_view.model.redo())
+    elif result_view.can_redo():
+        return render_template("edit-history.html", result=result_view, undo=False)
+    return redirect(url_for("frontend.validation_result", result=result))
+
+
+@frontend.errorhandler(EditConflictException)
+def edit_conflict(error):
+    return render_template("edit-conflict.html", result_id=error.result_id), 409
 
 
 @frontend.route("/validation/<result>/csv")
 def get_csv(result):
-    result_model = ResultModel.query.get(result)
-    if result_model is not None:
-        result = Result(**result_model.to_dict(), standard=brownfield_standard)
-        fields = brownfield_standard.current_standard_headers()
-        deprecated = result.meta_data["additional_headers"]
-        fields.extend(deprecated)
-        output = io.StringIO()
-        writer = csv.DictWriter(output, fields)
-        writer.writeheader()
-        for i, row in enumerate(result.rows):
-            r = row
-            original = result.input[i]
-            for field in deprecated:
-                r[field] = original.get(field, "")
-            writer.writerow(r)
-        csv_output = output.getvalue().encode("utf-8")
-        response = make_response(csv_output)
-        response.headers[
-            "Content-Disposition"
-        ] = f"attachment; filename=brownfield-land.csv"
-        response.headers["Content-Type"] = "text/csv; charset=utf-8"
-        return response
-    else:
+    last_modified = ResultModel.last_modified(result)
+    if last_modified is None:
         abort(404)
+    etag = result_etag(result, last_modified)
+    unchanged = not_modified(etag, last_modified)
+    if unchanged is not None:
+        return unchanged
+
+    result_model = ResultModel.query.options(
+        defer(ResultModel.result), defer(ResultModel.errors)
+    ).get(result)
+    deprecated = result_model.meta_data["additional_headers"]
+    fields = list(brownfield.headers) + deprecated
+    rows = result_model.iter_rows(batch_size=CSV_CHUNK_SIZE)
+    csv_output = generate_csv(rows, fields, deprecated)
+    response = Response(stream_with_context(csv_output))
+    response.headers[
+        "Content-Disposition"
+    ] = f"attachment; filename=brownfield-land.csv"
+    response.headers["Content-Type"] = "text/csv; charset=utf-8"
+    return set_validators(response, etag, last_modified)
 
 
 @frontend.route("/validation/edit/success")
@@ -167,6 +387,11 @@ def edit_complete():
     return render_template("edit-success.html")
 
 
+@frontend.context_processor
+def standard_context_processor():
+    return {"standard": brownfield}
+
+
 @frontend.context_processor
 def asset_path_context_processor():
     return {"asset_path": "/static/govuk_template"}
@@ -0,0 +1,241 @@
+import math
+
+import numpy as np
+
+# the National Grid, which OSGB36 eastings and northings are on
+AIRY_1830 = (6377563.396, 6356256.909)
+SCALE_FACTOR = 0.9996012717
+TRUE_ORIGIN = (math.radians(49), math.radians(-2))
+FALSE_ORIGIN = (400000, -100000)
+GRID_BOUNDS = (0, 0, 700000, 1300000)
+
+# the values of a row given with each site
+SITE_PROPERTIES = ["SiteReference", "SiteNameAddress"]
+
+# the ellipsoid ETRS89 and WGS84 are on, which are within a metre of each
+# other in Great Britain so are plotted as the same
+GRS80 = (6378137.0, 6356752.314140)
+
+# the Helmert transformation from OSGB36 to ETRS89, good to a few metres,
+# as translations in metres, scale in parts per million and rotations in
+# arc seconds
+OSGB36_TO_ETRS89 = {
+    "translation": (446.448, -125.157, 542.060),
+    "scale": -20.4894,
+    "rotation": (0.1502, 0.2470, 0.8421),
+}
+
+
+def coordinates(values):
+    """Returns GeoX or GeoY values as an array of floats, with nan for any
+    that are blank or not numbers.
+    """
+    return np.array([_float(v) for v in values], dtype=float)
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def to_wgs84(x, y):
+    """Returns arrays of longitudes and latitudes for arrays of GeoX and GeoY
+    values. Values that fit longitude and latitude are taken to be ETRS89 or
+    WGS84, and values that fit the National Grid to be OSGB36 eastings and
+    northings. Anything else gives nan.
+    """
+    longitude = np.full(x.shape, np.nan)
+    latitude = np.full(x.shape, np.nan)
+    degrees = (np.abs(x) <= 180) & (np.abs(y) <= 90)
+    longitude[degrees] = x[degrees]
+    latitude[degrees] = y[degrees]
+
+    west, south, east, north = GRID_BOUNDS
+    grid = ~degrees & (x >= west) & (x <= east) & (y >= south) & (y <= north)
+    if grid.any():
+        lat, lon = national_grid_to_osgb36(x[grid], y[grid])
+        lat, lon = helmert(lat, lon, AIRY_1830, GRS80, **OSGB36_TO_ETRS89)
+        longitude[grid] = np.degrees(lon)
+        latitude[grid] = np.degrees(lat)
+    return longitude, latitude
+
+
+def meridional_arc(lat, n, b):
+    lat0 = TRUE_ORIGIN[0]
+    d, s = lat - lat0, lat + lat0
+    return (
+        b
+        * SCALE_FACTOR
+        * (
+            (1 + n + 5 / 4 * n**2 + 5 / 4 * n**3) * d
+            - (3 * n + 3 * n**2 + 21 / 8 * n**3) * np.sin(d) * np.cos(s)
+            + (15 / 8 * n**2 + 15 / 8 * n**3) * np.sin(2 * d) * np.cos(2 * s)
+            - 35 / 24 * n**3 * np.sin(3 * d) * np.cos(3 * s)
+        )
+    )
+
+
+def national_grid_to_osgb36(easting, northing):
+    """Returns OSGB36 latitudes and longitudes in radians for National Grid
+    eastings and northings, by the inverse transverse Mercator projection in
+    the Ordnance Survey's guide to coordinate systems.
+    """
+    a, b = AIRY_1830
+    lat0, lon0 = TRUE_ORIGIN
+    e0, n0 = FALSE_ORIGIN
+    e2 = 1 - b**2 / a**2
+    n = (a - b) / (a + b)
+
+    lat = (northing - n0) / (a * SCALE_FACTOR) + lat0
+    for _ in range(10):
+        remainder = northing - n0 - meridional_arc(lat, n, b)
+        if np.all(np.abs(remainder) < 0.00001):
+            break
+        lat = lat + remainder / (a * SCALE_FACTOR)
+
+    sin2 = np.sin(lat) ** 2
+    nu = a * SCALE_FACTOR / np.sqrt(1 - e2 * sin2)
+    rho = a * SCALE_FACTOR * (1 - e2) / (1 - e2 * sin2) ** 1.5
+    eta2 = nu / rho - 1
+    tan = np.tan(lat)
+    sec = 1 / np.cos(lat)
+    de = easting - e0
+
+    vii = tan / (2 * rho * nu)
+    viii = tan / (24 * rho * nu**3) * (5 + 3 * tan**2 + eta2 - 9 * tan**2 * eta2)
+    ix = tan / (720 * rho * nu**5) * (61 + 90 * tan**2 + 45 * tan**4)
+    x = sec / nu
+    xi = sec / (6 * nu**3) * (nu / rho + 2 * tan**2)
+    xii = sec / (120 * nu**5) * (5 + 28 * tan**2 + 24 * tan**4)
+    xiia = sec / (5040 * nu**7) * (61 + 662 * tan**2 + 1320 * tan**4 + 720 * tan**6)
+
+    latitude = lat - vii * de**2 + viii * de**4 - ix * de**6
+    longitude = lon0 + x * de - xi * de**3 + xii * de**5 - xiia * de**7
+    return latitude, longitude
+
+
+def helmert(lat, lon, source, target, translation, scale, rotation):
+    """Moves latitudes and longitudes in radians from one datum to another,
+    by way of cartesian coordinates.
+    """
+    a, b = source
+    e2 = 1 - b**2 / a**2
+    nu = a / np.sqrt(1 - e2 * np.sin(lat) ** 2)
+    x = nu * np.cos(lat) * np.cos(lon)
+    y = nu * np.cos(lat) * np.sin(lon)
+    z = (1 - e2) * nu * np.sin(lat)
+
+    tx, ty, tz = translation
+    s = 1 + scale / 1e6
+    rx, ry, rz = (math.radians(r / 3600) for r in rotation)
+    x, y, z = (
+        tx + s * (x - rz * y + ry * z),
+        ty + s * (rz * x + y - rx * z),
+        tz + s * (-ry * x + rx * y + z),
+    )
+
+    a, b = target
+    e2 = 1 - b**2 / a**2
+    p = np.hypot(x, y)
+    lat = np.arctan2(z, p * (1 - e2))
+    for _ in range(10):
+        nu = a / np.sqrt(1 - e2 * np.sin(lat) ** 2)
+        lat = np.arctan2(z + e2 * nu * np.sin(lat), p)
+    return lat, np.arctan2(y, x)
+
+
+def cluster(longitude, latitude, cell_size):
+    """Groups points into the cells of a grid of the given size in degrees,
+    and returns the cell each point is in, and the number of points in each
+    cell and their mean position.
+    """
+    cells = np.stack(
+        [np.floor(longitude / cell_size), np.floor(latitude / cell_size)], axis=1
+    )
+    _, cell, counts = np.unique(cells, axis=0, return_inverse=True, return_counts=True)
+    cell = cell.reshape(-1)
+    centre_longitude = np.bincount(cell, weights=longitude) / counts
+    centre_latitude = np.bincount(cell, weights=latitude) / counts
+    return cell, counts, centre_longitude, centre_latitude
+
+
+class Sites:
+    """The sites in a register that can be plotted, held as arrays so they
+    can be picked out by area and clustered without a loop over every row.
+    """
+
+    def __init__(self, row_numbers, longitude, latitude, properties):
+        self.row_numbers = row_numbers
+        self.longitude = longitude
+        self.latitude = latitude
+        self.properties = properties
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Makes the sites from (row number, row) pairs, leaving out rows
+        whose GeoX and GeoY can not be plotted.
+        """
+        row_numbers, x, y, properties = [], [], [], []
+        for row_number, row in rows:
+            row_numbers.append(row_number)
+            x.append(row.get("GeoX"))
+            y.append(row.get("GeoY"))
+            properties.append({p: row.get(p, "") for p in SITE_PROPERTIES})
+        longitude, latitude = to_wgs84(coordinates(x), coordinates(y))
+        plotted = ~np.isnan(longitude)
+        return cls(
+            np.array(row_numbers, dtype=int)[plotted],
+            longitude[plotted],
+            latitude[plotted],
+            [properties[i] for i in np.flatnonzero(plotted)],
+        )
+
+    def __len__(self):
+        return len(self.row_numbers)
+
+    def within(self, west, south, east, north):
+        inside = (
+            (self.longitude >= west)
+            & (self.longitude <= east)
+            & (self.latitude >= south)
+            & (self.latitude <= north)
+        )
+        return Sites(
+            self.row_numbers[inside],
+            self.longitude[inside],
+            self.latitude[inside],
+            [self.properties[i] for i in np.flatnonzero(inside)],
+        )
+
+    def features(self, cell_size=None):
+        """Returns a GeoJSON feature for each site or, given a cell size in
+        degrees, for each cell of a grid with more than one site in it.
+        """
+        if cell_size is None or not len(self):
+            return [self.feature(i) for i in range(len(self))]
+        cell, counts, longitude, latitude = cluster(
+            self.longitude, self.latitude, cell_size
+        )
+        features = [
+            point(longitude[c], latitude[c], {"cluster": True, "count": int(n)})
+            for c, n in enumerate(counts)
+            if n > 1
+        ]
+        features.extend(self.feature(i) for i in np.flatnonzero(counts[cell] == 1))
+        return features
+
+    def feature(self, i):
+        properties = dict(self.properties[i], row=int(self.row_numbers[i]))
+        return point(self.longitude[i], self.latitude[i], properties)
+
+
+def point(longitude, latitude, properties):
+    # six decimal places is about 10cm
+    coordinates = [round(float(longitude), 6), round(float(latitude), 6)]
+    return {
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": coordinates},
+        "properties": properties,
+    }
@@ -0,0 +1,141 @@
+import io
+import datetime
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import current_app
+from sqlalchemy import or_
+from validator.utils import FileTypeException
+
+from application.extensions import db
+from application.frontend.models import ResultModel, ValidationJobModel
+from application.utils import HashedUpload, validate_upload
+
+
+def enqueue_validation(upload):
+    job = ValidationJobModel(
+        filename=upload.filename,
+        fingerprint=upload.fingerprint,
+        upload=upload.getvalue(),
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def claim_job():
+    """Claims the oldest pending job, or a running job whose worker has not
+    sent a heartbeat for longer than VALIDATION_JOB_TIMEOUT seconds.
+
+    Rows locked by another worker are skipped rather than waited on, so any
+    number of workers can poll the same table. A job that has already been
+    tried VALIDATION_JOB_ATTEMPTS times, most likely because it crashed its
+    worker, is failed instead of being claimed again.
+    """
+    stale = datetime.datetime.utcnow() - datetime.timedelta(
+        seconds=current_app.config["VALIDATION_JOB_TIMEOUT"]
+    )
+    while True:
+        job = (
+            ValidationJobModel.query.filter(
+                or_(
+                    ValidationJobModel.status == ValidationJobModel.PENDING,
+                    db.and_(
+                        ValidationJobModel.status == ValidationJobModel.RUNNING,
+                        ValidationJobModel.heartbeat_at < stale,
+                    ),
+                )
+            )
+            .order_by(ValidationJobModel.created_at)
+            .with_for_update(skip_locked=True)
+            .first()
+        )
+        if job is None:
+            db.session.rollback()
+            return None
+        if job.attempts >= current_app.config["VALIDATION_JOB_ATTEMPTS"]:
+            current_app.logger.error(f"Validation job {job.id} gave up")
+            job.status = ValidationJobModel.FAILED
+            job.message = "There was a problem checking your file"
+            job.upload = None
+            job.finished_at = datetime.datetime.utcnow()
+            db.session.commit()
+            continue
+        job.status = ValidationJobModel.RUNNING
+        job.attempts += 1
+        job.started_at = job.heartbeat_at = datetime.datetime.utcnow()
+        db.session.commit()
+        return job
+
+
+@contextmanager
+def heartbeat(job_id, interval):
+    """Marks a job as still running every interval seconds until the block
+    exits. Beats are written on their own connection from a thread, so they
+    carry on while validation holds the worker's process.
+    """
+    engine = db.engine
+    table = ValidationJobModel.__table__
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(interval):
+            with engine.begin() as connection:
+                connection.execute(
+                    table.update()
+                    .where(table.c.id == job_id)
+                    .values(heartbeat_at=datetime.datetime.utcnow())
+                )
+
+    thread = threading.Thread(target=beat, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run_job(job):
+    interval = max(1, current_app.config["VALIDATION_JOB_TIMEOUT"] // 4)
+    try:
+        # an identical upload may have been checked since this one was queued
+        job.result_id = ResultModel.reuse(job.fingerprint)
+        if job.result_id is None:
+            stream = io.BytesIO(job.upload)
+            with HashedUpload(job.filename, stream) as upload:
+                with heartbeat(job.id, interval):
+                    res = validate_upload(upload)
+            result = ResultModel(res, fingerprint=job.fingerprint)
+            db.session.add(result)
+            db.session.flush()
+            job.result_id = result.id
+        job.status = ValidationJobModel.COMPLETE
+    except FileTypeException as e:
+        db.session.rollback()
+        job.status = ValidationJobModel.FAILED
+        job.message = f"{e}"
+    except Exception:
+        current_app.logger.exception(f"Validation job {job.id} failed")
+        db.session.rollback()
+        job.status = ValidationJobModel.FAILED
+        job.message = "There was a problem checking your file"
+    job.upload = None
+    job.finished_at = datetime.datetime.utcnow()
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def work(poll_interval=1.0, burst=False):
+    processed = 0
+    while True:
+        job = claim_job()
+        if job is not None:
+            run_job(job)
+            processed += 1
+        elif burst:
+            return processed
+        else:
+            time.sleep(poll_interval)
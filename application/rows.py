@@ -0,0 +1,153 @@
+import sys
+from collections.abc import MutableMapping, Sequence
+
+# marks a cell a row does not have, as a row can be missing a header that
+# other rows have
+_MISSING = object()
+
+
+class ColumnarRows(Sequence):
+    """Register rows held a column at a time, as one list of values for each
+    header, rather than as a dict per row repeating every header. Text is
+    interned, so a value repeated down a column, such as a blank or the
+    organisation, is only held once.
+
+    Indexing gives a ColumnarRow, which can be read and changed like the dict
+    it stands in for. Slicing gives a new ColumnarRows.
+    """
+
+    __slots__ = ("columns", "length")
+
+    def __init__(self, columns=None, length=0):
+        self.columns = columns if columns is not None else {}
+        self.length = length
+
+    @classmethod
+    def from_dicts(cls, rows):
+        columnar = cls()
+        for row in rows:
+            columnar.append(row)
+        return columnar
+
+    def append(self, row):
+        for header in row.keys() - self.columns.keys():
+            self.add_column(header)
+        for header, column in self.columns.items():
+            value = row.get(header, _MISSING)
+            if type(value) is str:
+                value = sys.intern(value)
+            column.append(value)
+        self.length += 1
+
+    def add_column(self, header):
+        column = [_MISSING] * self.length
+        self.columns[sys.intern(header)] = column
+        return column
+
+    def to_dicts(self):
+        columns = list(self.columns.items())
+        return [
+            {h: c[i] for h, c in columns if c[i] is not _MISSING}
+            for i in range(self.length)
+        ]
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.length)
+            columns = {h: c[index] for h, c in self.columns.items()}
+            return ColumnarRows(columns, len(range(start, stop, step)))
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("row index out of range")
+        return ColumnarRow(self, index)
+
+    def __repr__(self):
+        return f"<ColumnarRows {self.length} rows, {len(self.columns)} columns>"
+
+
+class ColumnarRow(MutableMapping):
+    """One row of a ColumnarRows. Changes are made to the columns it reads
+    from, so they are seen by anything else holding the rows.
+    """
+
+    __slots__ = ("rows", "index")
+
+    def __init__(self, rows, index):
+        self.rows = rows
+        self.index = index
+
+    def __getitem__(self, header):
+        value = self.rows.columns[header][self.index]
+        if value is _MISSING:
+            raise KeyError(header)
+        return value
+
+    def get(self, header, default=None):
+        column = self.rows.columns.get(header)
+        if column is None or column[self.index] is _MISSING:
+            return default
+        return column[self.index]
+
+    def __setitem__(self, header, value):
+        column = self.rows.columns.get(header)
+        if column is None:
+            column = self.rows.add_column(header)
+        column[self.index] = value
+
+    def __delitem__(self, header):
+        self[header]
+        self.rows.columns[header][self.index] = _MISSING
+
+    def __iter__(self):
+        for header, column in list(self.rows.columns.items()):
+            if column[self.index] is not _MISSING:
+                yield header
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+def row_dicts(rows):
+    """Returns rows as a list of dicts, for code such as the validator that
+    needs real dicts.
+    """
+    if isinstance(rows, ColumnarRows):
+        return rows.to_dicts()
+    return rows
+
+
+def base_row(input, headers):
+    """Returns the cells of an input row that its checked row starts from,
+    which are those under the given headers.
+    """
+    return {header: input[header] for header in headers if header in input}
+
+
+def row_changes(base, row):
+    """Returns how a checked row differs from the row it started from, as the
+    cells set to a new value and the cells taken out. Rows that have not been
+    changed give an empty dict.
+    """
+    changes = {}
+    cells = {k: v for k, v in row.items() if k not in base or base[k] != v}
+    if cells:
+        changes["set"] = cells
+    removed = [k for k in base if k not in row]
+    if removed:
+        changes["unset"] = removed
+    return changes
+
+
+def apply_changes(base, changes):
+    row = dict(base)
+    for header in changes.get("unset", []):
+        row.pop(header, None)
+    row.update(changes.get("set", {}))
+    return row
@@ -0,0 +1,35 @@
+import functools
+import hashlib
+import json
+
+from validator.standards import BrownfieldStandard
+
+
+def standard_version(standard):
+    schema = json.dumps(standard.schema, sort_keys=True, default=str)
+    return hashlib.sha256(schema.encode("utf-8")).hexdigest()[:12]
+
+
+class CompiledStandard:
+    """A standard with everything the app looks up on it worked out once: a
+    version for its schema, its headers in order and a set of them for
+    membership tests.
+
+    standard is the validator's own standard, to pass to the validator.
+    """
+
+    def __init__(self, standard):
+        self.standard = standard
+        self.schema = standard.schema
+        self.version = standard_version(standard)
+        self.headers = tuple(standard.current_standard_headers())
+        self.header_index = frozenset(self.headers)
+
+    def is_standard_header(self, header):
+        return header in self.header_index
+
+
+@functools.lru_cache(maxsize=None)
+def get_standard(standard_class=BrownfieldStandard):
+    """Returns the compiled standard, which is built once per process."""
+    return CompiledStandard(standard_class())
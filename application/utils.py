@@ -1,14 +1,32 @@
 import os
+import re
+import csv
+import io
+import math
+import hashlib
 import tempfile
 import collections
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import repeat
 
-from validator.standards import BrownfieldStandard
+from flask import current_app
 from werkzeug.utils import secure_filename
 from validator.validation_result import Result
 from validator.validator import validate_file, check_data
 
+from application.rows import row_dicts
+from application.standards import get_standard
 
-brownfield_standard = BrownfieldStandard()
+
+brownfield = get_standard()
+
+CSV_CHUNK_SIZE = 500
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# columns that are checked together, so a change to one means re-checking both
+COLUMN_GROUPS = [{"GeoX", "GeoY"}]
 
 
 class InvalidEditException(Exception):
@@ -17,9 +35,84 @@ class InvalidEditException(Exception):
         self.invalid_edits = invalid_edits
 
 
+class EditConflictException(Exception):
+    def __init__(self, result_id):
+        super().__init__(f"Result {result_id} was changed by another edit")
+        self.result_id = result_id
+
+
 Edit = collections.namedtuple("Edit", "index current update")
 
 
+class ParseOnlyStandard:
+    """Wraps a standard with a schema that has no fields, so validate_file
+    reads and normalises a file without checking any of its values.
+    """
+
+    def __init__(self, standard):
+        self.standard = standard
+        self.schema = dict(standard.schema, fields=[])
+
+    def __getattr__(self, name):
+        if name == "standard":
+            # not set yet, as when copying
+            raise AttributeError(name)
+        return getattr(self.standard, name)
+
+
+class HashedUpload:
+    """An uploaded file read once from its stream into a temporary file, and
+    hashed as it is written. validate_file needs a path, so the file is only
+    ever copied this once.
+    """
+
+    def __init__(self, filename, stream):
+        self.filename = secure_filename(filename)
+        self.suffix = os.path.splitext(self.filename)[1]
+        self.size = 0
+        self.hash = hashlib.sha256()
+        self.file = tempfile.NamedTemporaryFile(suffix=self.suffix, delete=False)
+        try:
+            for chunk in iter(partial(stream.read, UPLOAD_CHUNK_SIZE), b""):
+                self.hash.update(chunk)
+                self.size += len(chunk)
+                self.file.write(chunk)
+            self.file.flush()
+        except BaseException:
+            self.close()
+            raise
+
+    @property
+    def path(self):
+        return self.file.name
+
+    @property
+    def digest(self):
+        return self.hash.hexdigest()
+
+    @property
+    def fingerprint(self):
+        # the same bytes checked against a different standard, or read as a
+        # different type of file, is a different result
+        return f"{brownfield.version}:{self.suffix.lower()}:{self.digest}"
+
+    def getvalue(self):
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            os.unlink(self.file.name)
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
 def to_boolean(value):
     if value is None:
         return False
@@ -46,7 +139,7 @@ def compile_header_edits(form, originals):
         for edit in header_edits:
             if (
                 edit.current != edit.update
-                and edit.update not in brownfield_standard.current_standard_headers()
+                and edit.update not in brownfield.header_index
             ):
                 invalid_edits[edit.index] = edit
         if invalid_edits:
@@ -56,63 +149,191 @@ def compile_header_edits(form, originals):
     return header_edits, new_headers
 
 
-def write_tempfile_and_validate(form):
-    with tempfile.TemporaryDirectory() as temp_dir:
-        filename = secure_filename(form.upload.data.filename)
-        output_dir = f"{temp_dir}/data"
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-        file = os.path.join(output_dir, filename)
-        form.upload.data.save(file)
-        report = validate_file(file, brownfield_standard)
-    return report
+def read_upload(file_storage):
+    return HashedUpload(file_storage.filename, file_storage.stream)
 
 
-def set_new_header(result, current, update):
-    for i, row in enumerate(result.input):
-        item = row.pop(current, None)
-        if item is not None:
-            result.rows[i][update] = item
+def validate_upload(upload):
+    if current_app.config["VALIDATION_WORKERS"] > 1:
+        return validate_file_in_parallel(upload.path, brownfield.standard)
+    return validate_file(upload.path, brownfield.standard)
 
 
-def add_new_header(result, header):
-    for i, row in enumerate(result.rows):
-        result.rows[i][header] = ""
+def validate_path(path):
+    return validate_file(path, brownfield.standard)
+
+
+def validate_file_in_parallel(file, standard):
+    parsed = validate_file(file, ParseOnlyStandard(standard))
+    return Result(
+        result=check_rows(parsed.rows, standard.schema),
+        input=parsed.input,
+        rows=parsed.rows,
+        meta_data=parsed.meta_data,
+        standard=standard,
+    )
+
+
+def unique_fields(schema):
+    primary_key = schema.get("primaryKey") or []
+    if isinstance(primary_key, str):
+        primary_key = [primary_key]
+    unique = {
+        f["name"] for f in schema["fields"] if f.get("constraints", {}).get("unique")
+    }
+    return unique | set(primary_key)
+
+
+def check_rows(rows, schema):
+    """Checks rows in one process, or split into chunks across a pool of
+    VALIDATION_WORKERS processes once there are more than
+    PARALLEL_VALIDATION_THRESHOLD rows.
+
+    A chunk can only find duplicates within itself, so if any row or any value
+    of a unique field is repeated across chunks the rows are checked in one
+    process instead.
+    """
+    workers = current_app.config["VALIDATION_WORKERS"]
+    if workers <= 1 or len(rows) < current_app.config["PARALLEL_VALIDATION_THRESHOLD"]:
+        return check_data(row_dicts(rows), schema)
+
+    chunk_size = math.ceil(len(rows) / (workers * 2))
+    chunks = [
+        row_dicts(rows[i : i + chunk_size]) for i in range(0, len(rows), chunk_size)
+    ]
+    if repeated_across_chunks(chunks, unique_fields(schema)):
+        return check_data(row_dicts(rows), schema)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        reports = list(executor.map(check_data, chunks, repeat(schema)))
+    return merge_reports(reports, chunk_size)
+
+
+def repeated_across_chunks(chunks, unique):
+    keys = [None] + [(field,) for field in sorted(unique)]
+    seen = {}
+    for i, chunk in enumerate(chunks):
+        for row in chunk:
+            for key in keys:
+                values = tuple(row.values()) if key is None else (row.get(key[0]),)
+                if all(v in (None, "") for v in values):
+                    continue
+                if seen.setdefault((key, values), i) != i:
+                    return True
+    return False
+
+
+def merge_reports(reports, chunk_size):
+    """Combines the reports for consecutive chunks of rows into one report,
+    renumbering row errors by the position of their chunk.
+    """
+    first = reports[0]["tables"][0]
+    errors = [e for e in first["errors"] if "row-number" not in e]
+    for i, report in enumerate(reports):
+        offset = i * chunk_size
+        for e in report["tables"][0]["errors"]:
+            if "row-number" in e:
+                row_number = e["row-number"] + offset
+                message = re.sub(
+                    rf"\bin row {e['row-number']}\b",
+                    f"in row {row_number}",
+                    e.get("message", ""),
+                    count=1,
+                )
+                errors.append(dict(e, message=message, **{"row-number": row_number}))
+
+    counts = {"valid": not errors, "error-count": len(errors)}
+    # each chunk's row-count includes its header row, which the file has once
+    row_count = sum(r["tables"][0].get("row-count", 1) - 1 for r in reports) + 1
+    time = round(sum(r.get("time", 0) for r in reports), 3)
+    table = dict(first, errors=errors, time=time, **counts, **{"row-count": row_count})
+    return dict(reports[0], tables=[table], time=time, **counts)
+
+
+class HeaderChanges:
+    """Every rename and addition from a header edit, worked out up front so
+    they can all be made in one pass over the register.
+
+    renames maps each header in the input to the header its values move to,
+    in the order the edits were made, and additions are the headers to add
+    to every row with no value.
+    """
+
+    def __init__(self, header_edits, new_headers):
+        self.renames = {}
+        self.additions = []
+        self.headers_added = []
+        self.headers_removed = []
+        self.header_changes = []
+        for edit in header_edits:
+            if edit.current != edit.update:
+                self.renames[edit.current] = edit.update
+                self.headers_added.append(edit.update)
+                self.headers_removed.append(edit.current)
+                self.header_changes.append((edit.update, edit.current))
+            else:
+                self.headers_removed.append(edit.current)
+
+        for header in new_headers:
+            if header not in self.headers_added:
+                self.additions.append(header)
+                self.headers_added.append(header)
+                self.header_changes.append((header, "ADDED"))
+
+    def apply(self, result):
+        renames = list(self.renames.items())
+        for input_row, row in zip(result.input, result.rows):
+            for current, update in renames:
+                item = input_row.pop(current, None)
+                if item is not None:
+                    row[update] = item
+            for header in self.additions:
+                row[header] = ""
 
 
 def update_and_save_headers(result, header_edits, new_headers):
-    headers_added = []
-    headers_removed = []
-    header_changes = []
-    for edit in header_edits:
-        if edit.current != edit.update:
-            set_new_header(result, current=edit.current, update=edit.update)
-            headers_added.append(edit.update)
-            headers_removed.append(edit.current)
-            header_changes.append((edit.update, edit.current))
-        else:
-            headers_removed.append(edit.current)
-
-    for header in new_headers:
-        if header not in headers_added:
-            add_new_header(result, header)
-            headers_added.append(header)
-            header_changes.append((header, "ADDED"))
+    changes = HeaderChanges(header_edits, new_headers)
+    changes.apply(result)
 
     result.reconcile_header_results(
-        headers_added=headers_added, headers_removed=headers_removed
+        headers_added=changes.headers_added, headers_removed=changes.headers_removed
     )
 
     return {
         "result": result,
-        "headers_added": headers_added,
-        "headers_removed": headers_removed,
-        "header_changes": header_changes,
+        "headers_added": changes.headers_added,
+        "headers_removed": changes.headers_removed,
+        "header_changes": changes.header_changes,
     }
 
 
-def revalidate_result(result, standard):
-    res = check_data(result.rows, standard.schema)
+def apply_all_fixes(result, columns):
+    """Applies the suggested fixes for every given column in one pass over
+    the rows with fixes, and returns the fixes made for each column in the
+    form Result.apply_fixes gives them.
+    """
+    fixes_by_row = collections.defaultdict(list)
+    for column in columns:
+        for e in result.errors_by_column.get(column, {}).get("errors", []):
+            if e["fix"]:
+                fixes_by_row[e["row"]].append((column, e["fix"]))
+
+    fixes_applied = {column: [] for column in columns}
+    for row_number in sorted(fixes_by_row):
+        row = result.rows[row_number - 1]
+        for column, fix in fixes_by_row[row_number]:
+            fixes_applied[column].append(
+                {"row": row_number, "from": row.get(column), "to": fix}
+            )
+            row[column] = fix
+    return fixes_applied
+
+
+def revalidate_result(result, standard, columns=None):
+    if columns is None:
+        res = check_rows(result.rows, standard.schema)
+    else:
+        res = revalidate_columns(result, standard, columns)
     return Result(
         id=result.id,
         result=res,
@@ -121,3 +342,130 @@ def revalidate_result(result, standard):
         meta_data=result.meta_data,
         standard=standard,
     )
+
+
+def expand_columns(columns):
+    expanded = set(columns)
+    for group in COLUMN_GROUPS:
+        if expanded & group:
+            expanded |= group
+    return expanded
+
+
+def error_column(error, headers):
+    column_number = error.get("column-number")
+    if column_number is not None and 0 < column_number <= len(headers):
+        return headers[column_number - 1]
+    return error.get("message-data", {}).get("field_name")
+
+
+def renumber_column(error, column_number):
+    """Returns a cell error moved to another column number, in its message as
+    well as its column-number.
+    """
+    if error.get("column-number") == column_number:
+        return error
+    message = re.sub(
+        rf"\bcolumn {error.get('column-number')}\b",
+        f"column {column_number}",
+        error.get("message", ""),
+        count=1,
+    )
+    return dict(error, message=message, **{"column-number": column_number})
+
+
+def revalidate_columns(result, standard, columns):
+    """Re-checks only the cells in the given columns and merges the new errors
+    into the existing report, rather than checking every cell again.
+
+    Header errors are taken from a check of the first row against the full
+    schema, which is cheap and keeps column numbering the same as a full check.
+    Errors for a whole row, such as blank or duplicate rows, are kept from the
+    existing report, so an edit that changes the headers of the rows, and with
+    them what a whole row is, falls back to a full check. Uniqueness is checked
+    across every row, so an edit to a key or unique column does too.
+    """
+    if not result.rows or not result.result or not result.result.get("tables"):
+        return check_rows(result.rows, standard.schema)
+
+    columns = expand_columns(columns)
+    if columns & unique_fields(standard.schema):
+        return check_rows(result.rows, standard.schema)
+
+    fields = [f for f in standard.schema["fields"] if f["name"] in columns]
+
+    header_check = check_data(row_dicts(result.rows[:1]), standard.schema)
+    header_table = header_check["tables"][0]
+    headers = header_table["headers"]
+
+    table = result.result["tables"][0]
+    if headers != table["headers"]:
+        return check_rows(result.rows, standard.schema)
+
+    errors = [e for e in header_table["errors"] if "row-number" not in e]
+    cell_errors = []
+    for e in table["errors"]:
+        if "row-number" not in e:
+            continue
+        column = error_column(e, table["headers"])
+        if column is None:
+            errors.append(e)
+        elif column not in columns:
+            cell_errors.append((column, e))
+
+    checked = [f["name"] for f in fields if f["name"] in headers]
+    if checked:
+        schema = dict(
+            standard.schema, fields=[f for f in fields if f["name"] in checked]
+        )
+        schema.pop("primaryKey", None)
+        rows = [{c: row.get(c, "") for c in checked} for row in result.rows]
+        partial_table = check_rows(rows, schema)["tables"][0]
+        # row errors from the partial check, such as a row that is blank in
+        # just these columns, are not errors in the full row
+        cell_errors.extend(
+            (error_column(e, partial_table["headers"]), e)
+            for e in partial_table["errors"]
+            if "row-number" in e and error_column(e, partial_table["headers"])
+        )
+
+    for column, e in cell_errors:
+        if column in headers:
+            errors.append(renumber_column(e, headers.index(column) + 1))
+    errors.sort(key=lambda e: (e.get("row-number", 0), e.get("column-number", 0)))
+
+    counts = {"valid": not errors, "error-count": len(errors)}
+    merged_table = dict(table, headers=headers, errors=errors, **counts)
+    return dict(result.result, tables=[merged_table], **counts)
+
+
+def generate_csv(rows, fields, deprecated, chunk_size=CSV_CHUNK_SIZE):
+    """Yields a register as csv text, the header line first and then the
+    rows in chunks of chunk_size, so the whole file is never held in memory.
+
+    rows is an iterable of (row, original input row) pairs. Values for
+    deprecated headers are carried over from the original input.
+    """
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fields)
+
+    def flush():
+        chunk = output.getvalue()
+        output.seek(0)
+        output.truncate(0)
+        return chunk
+
+    writer.writeheader()
+    yield flush()
+
+    for i, (row, original) in enumerate(rows, start=1):
+        r = dict(row)
+        for field in deprecated:
+            r[field] = original.get(field, "")
+        writer.writerow(r)
+        if i % chunk_size == 0:
+            yield flush()
+
+    chunk = flush()
+    if chunk:
+        yield chunk
@@ -0,0 +1,77 @@
+"""Compares writing, reading and storing register rows as jsonb and as
+compressed json in bytea, the way ResultRowModel stores them.
+
+    DATABASE_URL=postgresql://localhost/brownfield python -m benchmarks.row_storage [rows]
+"""
+import os
+import sys
+import time
+
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, func, select
+from sqlalchemy.dialects.postgresql import JSONB
+
+from application.codecs import EncodedJSON, JSONCodec
+from benchmarks.rows_memory import load_rows
+
+
+def layouts():
+    metadata = MetaData()
+    yield "jsonb", Table(
+        "benchmark_rows_jsonb",
+        metadata,
+        Column("row_number", Integer, primary_key=True),
+        Column("input", JSONB),
+        Column("data", JSONB),
+    )
+    for level in [0, 1, 6]:
+        codec = JSONCodec(level)
+        yield f"bytea level {level}", Table(
+            f"benchmark_rows_bytea_{level}",
+            metadata,
+            Column("row_number", Integer, primary_key=True),
+            Column("input", EncodedJSON(codec)),
+            Column("data", EncodedJSON(codec)),
+        )
+
+
+def run(engine, table, rows):
+    table.drop(engine, checkfirst=True)
+    table.create(engine)
+    try:
+        start = time.perf_counter()
+        with engine.begin() as connection:
+            for i in range(0, len(rows), 1000):
+                connection.execute(table.insert(), rows[i : i + 1000])
+        written = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with engine.connect() as connection:
+            count = sum(1 for _ in connection.execute(select(table)))
+        read = time.perf_counter() - start
+
+        with engine.connect() as connection:
+            connection.exec_driver_sql(f"VACUUM ANALYZE {table.name}")
+            size = connection.execute(
+                select(func.pg_total_relation_size(table.name))
+            ).scalar()
+        return count, written, read, size
+    finally:
+        table.drop(engine)
+
+
+def main(count=100_000):
+    engine = create_engine(os.environ["DATABASE_URL"], isolation_level="AUTOCOMMIT")
+    rows = [
+        {"row_number": i, "input": row, "data": row}
+        for i, row in enumerate(load_rows(count), start=1)
+    ]
+    for name, table in layouts():
+        count, written, read, size = run(engine, table, rows)
+        print(
+            f"{name:>14}: {count} rows, write {written:.2f}s, read {read:.2f}s, "
+            f"{size / 1024 / 1024:.1f} MiB on disk"
+        )
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
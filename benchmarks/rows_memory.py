@@ -0,0 +1,48 @@
+"""Compares the memory held by a register's rows as a list of dicts and as
+ColumnarRows.
+
+    python -m benchmarks.rows_memory [rows]
+"""
+import gc
+import json
+import sys
+import tracemalloc
+
+from application.rows import ColumnarRows
+from tests.data.result import result
+
+
+def load_rows(count):
+    # rows come back from the database as freshly decoded json, so no strings
+    # are shared between them
+    row = dict(result["input"][0])
+    for i in range(count):
+        unique = {
+            "SiteReference": f"BLR/{i}",
+            "SiteNameAddress": f"{i} Oxford Road",
+            "GeoX": f"{-1.3 + i / 1e6:.6f}",
+            "GeoY": f"{51.0 + i / 1e6:.6f}",
+            "Hectares": f"{i % 1000 / 100}",
+            "DevelopmentDescription": f"Erection of {i} dwellings",
+        }
+        yield json.loads(json.dumps(dict(row, **unique)))
+
+
+def measure(build, count):
+    gc.collect()
+    tracemalloc.start()
+    rows = build(load_rows(count))
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(rows), size
+
+
+def main(count=100_000):
+    for name, build in [("dicts", list), ("columnar", ColumnarRows.from_dicts)]:
+        rows, size = measure(build, count)
+        print(f"{name:>10}: {rows} rows, {size / 1024 / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
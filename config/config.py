@@ -17,6 +17,21 @@ class Config:
         )
 
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    ASYNC_VALIDATION = os.getenv("ASYNC_VALIDATION", "false").lower() in ["1", "true"]
+    VALIDATION_JOB_TIMEOUT = int(os.getenv("VALIDATION_JOB_TIMEOUT", 600))
+    VALIDATION_JOB_ATTEMPTS = int(os.getenv("VALIDATION_JOB_ATTEMPTS", 3))
+    VALIDATION_WORKERS = int(os.getenv("VALIDATION_WORKERS", 1))
+    PARALLEL_VALIDATION_THRESHOLD = int(
+        os.getenv("PARALLEL_VALIDATION_THRESHOLD", 5000)
+    )
+    BULK_VALIDATION_WORKERS = int(os.getenv("BULK_VALIDATION_WORKERS", 2))
+    RESULT_RETENTION_DAYS = int(os.getenv("RESULT_RETENTION_DAYS", 7))
+    RESULT_EDIT_ATTEMPTS = int(os.getenv("RESULT_EDIT_ATTEMPTS", 3))
+    RESULT_SNAPSHOT_INTERVAL = int(os.getenv("RESULT_SNAPSHOT_INTERVAL", 10))
+    RENDER_CACHE_SIZE = int(os.getenv("RENDER_CACHE_SIZE", 0))
+    SITE_CACHE_SIZE = int(os.getenv("SITE_CACHE_SIZE", 16))
+    MAPBOX_TOKEN = os.getenv("MAPBOX_TOKEN")
+    RESULT_ROW_COMPRESSION = int(os.getenv("RESULT_ROW_COMPRESSION", 1))
 
 
 class DevelopmentConfig(Config):
@@ -0,0 +1,81 @@
+"""empty message
+
+Revision ID: 5b7c9e21d4a3
+Revises: ebf1aa2d4fb4
+Create Date: 2020-01-14 11:02:37.418265
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "5b7c9e21d4a3"
+down_revision = "ebf1aa2d4fb4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "result_row_model",
+        sa.Column("result_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("row_number", sa.Integer(), nullable=False),
+        sa.Column("input", postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column("data", postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column("errors", postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["result_id"], ["result_model.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("result_id", "row_number"),
+    )
+
+    # backfill one row per element of the existing rows arrays
+    op.execute(
+        """
+        INSERT INTO result_row_model (result_id, row_number, input, data, errors)
+        SELECT r.id, x.n, r.input -> (x.n::int - 1), x.data, r.errors_by_row -> (x.n::int - 1)
+        FROM result_model r,
+             jsonb_array_elements(r.rows) WITH ORDINALITY AS x(data, n)
+        WHERE jsonb_typeof(r.rows) = 'array'
+        """
+    )
+
+    op.drop_column("result_model", "input")
+    op.drop_column("result_model", "rows")
+    op.drop_column("result_model", "errors_by_row")
+
+
+def downgrade():
+    op.add_column(
+        "result_model",
+        sa.Column(
+            "errors_by_row", postgresql.JSONB(astext_type=sa.Text()), nullable=True
+        ),
+    )
+    op.add_column(
+        "result_model",
+        sa.Column("rows", postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    )
+    op.add_column(
+        "result_model",
+        sa.Column("input", postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    )
+
+    op.execute(
+        """
+        UPDATE result_model r
+        SET input = x.input, rows = x.data, errors_by_row = x.errors
+        FROM (
+            SELECT result_id,
+                   jsonb_agg(input ORDER BY row_number) AS input,
+                   jsonb_agg(data ORDER BY row_number) AS data,
+                   jsonb_agg(errors ORDER BY row_number) AS errors
+            FROM result_row_model
+            GROUP BY result_id
+        ) x
+        WHERE r.id = x.result_id
+        """
+    )
+
+    op.drop_table("result_row_model")
@@ -0,0 +1,63 @@
+"""empty message
+
+Revision ID: 6d4e2b9c8a71
+Revises: 3f81c2d7a9e4
+Create Date: 2020-02-24 11:32:07.914826
+
+"""
+import zlib
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "6d4e2b9c8a71"
+down_revision = "3f81c2d7a9e4"
+branch_labels = None
+depends_on = None
+
+# existing rows are kept as plain json text, which is read back as it is,
+# and rows written from now on are compressed
+COLUMNS = ["input", "data"]
+
+
+def upgrade():
+    for column in COLUMNS:
+        op.alter_column(
+            "result_row_model",
+            column,
+            type_=postgresql.BYTEA(),
+            postgresql_using=f"convert_to({column}::text, 'UTF8')",
+        )
+
+
+def downgrade():
+    # compressed values can only be expanded here, so turn them back into
+    # json text before changing the columns back
+    connection = op.get_bind()
+    for column in COLUMNS:
+        compressed = connection.execute(
+            sa.text(
+                f"SELECT result_id, row_number, {column} FROM result_row_model "
+                f"WHERE get_byte({column}, 0) = 120"
+            )
+        )
+        for result_id, row_number, value in compressed:
+            connection.execute(
+                sa.text(
+                    f"UPDATE result_row_model SET {column} = :value "
+                    "WHERE result_id = :result_id AND row_number = :row_number"
+                ),
+                {
+                    "value": zlib.decompress(value),
+                    "result_id": result_id,
+                    "row_number": row_number,
+                },
+            )
+        op.alter_column(
+            "result_row_model",
+            column,
+            type_=postgresql.JSONB(astext_type=sa.Text()),
+            postgresql_using=f"convert_from({column}, 'UTF8')::jsonb",
+        )
@@ -31,6 +31,7 @@ def client(app):
 @pytest.fixture(scope="session")
 def db(app, request):
     def teardown():
+        _db.session.remove()
         _db.drop_all()
 
     _db.app = app
@@ -0,0 +1,102 @@
+from flask import url_for
+
+from application.frontend.models import ResultModel
+
+
+def test_api_returns_only_the_requested_summary_fields(app, db, result):
+    result_model = ResultModel(result)
+    db.session.add(result_model)
+    db.session.commit()
+
+    with app.test_client() as client:
+        url = url_for("api.validation_result", result=result_model.id)
+        resp = client.get(url, query_string={"fields": "valid,row_count"})
+        assert resp.json == {"valid": result.valid(), "row_count": 2}
+
+        resp = client.get(url, query_string={"fields": "rows"})
+        assert resp.status_code == 400
+
+
+def test_api_pages_rows_by_row_number(app, db, result):
+    result_model = ResultModel(result)
+    db.session.add(result_model)
+    db.session.commit()
+
+    with app.test_client() as client:
+        url = url_for("api.validation_rows", result=result_model.id)
+        resp = client.get(url, query_string={"limit": 1, "fields": "data"})
+        assert resp.json["items"] == [{"data": result.rows[0]}]
+
+        resp = client.get(resp.json["next"])
+        assert resp.json["items"] == [{"data": result.rows[1]}]
+        assert resp.json["next"] is None
+
+
+def test_api_pages_report_errors(app, db, result):
+    result_model = ResultModel(result)
+    db.session.add(result_model)
+    db.session.commit()
+    errors = result.result["tables"][0]["errors"]
+
+    with app.test_client() as client:
+        url = url_for("api.validation_errors", result=result_model.id)
+        resp = client.get(url, query_string={"limit": 1, "fields": "code"})
+        assert resp.json["items"] == [{"code": errors[0]["code"]}]
+
+        resp = client.get(resp.json["next"])
+        assert resp.json["items"] == [{"code": errors[1]["code"]}]
+
+        resp = client.get(url, query_string={"fields": "code,bogus"})
+        assert resp.status_code == 400
+
+
+def test_api_returns_json_for_missing_results(app, db):
+    with app.test_client() as client:
+        url = url_for(
+            "api.validation_result", result="00000000-0000-0000-0000-000000000000"
+        )
+        resp = client.get(url)
+        assert resp.status_code == 404
+        assert "error" in resp.json
+
+
+def test_api_gives_errors_for_a_page_of_rows(app, db, result):
+    result_model = ResultModel(result)
+    db.session.add(result_model)
+    db.session.commit()
+
+    with app.test_client() as client:
+        url = url_for(
+            "api.validation_rows",
+            result=result_model.id,
+            fields="row_number,errors",
+            after=1,
+        )
+        resp = client.get(url)
+        assert resp.json["items"] == [
+            {"row_number": 2, "errors": result.errors_by_row[1]}
+        ]
+
+
+def test_api_gives_plotted_sites_as_geojson(app, db, result):
+    result_model = ResultModel(result)
+    db.session.add(result_model)
+    db.session.commit()
+
+    with app.test_client() as client:
+        url = url_for("api.validation_geojson", result=result_model.id)
+        resp = client.get(url)
+        etag = resp.headers["ETag"]
+        # the first row's GeoX is not a number, so only the second is plotted
+        [site] = resp.json["features"]
+        assert site["properties"]["row"] == 2
+        longitude, latitude = site["geometry"]["coordinates"]
+        assert round(longitude, 2) == -1.32 and round(latitude, 2) == 51.07
+
+        resp = client.get(url, query_string={"bbox": "0,50,1,51", "zoom": 10})
+        assert resp.json["features"] == []
+        resp = client.get(url, query_string={"bbox": "north"})
+        assert resp.status_code == 400
+
+        resp = client.get(url, headers={"If-None-Match": etag})
+        assert resp.status_code == 304
@@ -0,0 +1,68 @@
+import io
+import zipfile
+
+from flask import url_for
+
+from application.frontend.models import ResultModel, ValidationJobModel
+from application.jobs import work
+
+
+def test_bulk_validation_queues_a_job_for_each_file(app, db, csv_file):
+    with open(csv_file, "rb") as f:
+        content = f.read()
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as z:
+        z.writestr("registers/first.csv", content)
+        z.writestr("registers/second.csv", content.replace(b"\n", b"\r\n"))
+        z.writestr("__MACOSX/registers/._first.csv", b"")
+    archive.seek(0)
+
+    with app.test_client() as client:
+        resp = client.post(
+            url_for("api.validate_bulk_uploads"),
+            data={
+                "upload": [
+                    (archive, "registers.zip"),
+                    (io.BytesIO(content), "third.csv"),
+                ]
+            },
+            content_type="multipart/form-data",
+        )
+
+    assert resp.status_code == 202
+    results = resp.json["results"]
+    assert [r["filename"] for r in results] == ["first.csv", "second.csv", "third.csv"]
+    assert all(r["status"] == ValidationJobModel.PENDING for r in results)
+    assert len({r["job"] for r in results}) == 3
+
+    assert work(burst=True) == 3
+    with app.test_client() as client:
+        statuses = [client.get(r["status_url"]).json for r in results]
+    assert all(s["status"] == ValidationJobModel.COMPLETE for s in statuses)
+    assert all(ResultModel.query.get(s["result"]).row_count == 2 for s in statuses)
+
+
+def test_bulk_validation_gives_results_for_files_checked_before(app, db, csv_file):
+    with open(csv_file, "rb") as f:
+        # a file no other test has checked
+        content = f.read() + b"\n"
+    url = url_for("api.validate_bulk_uploads")
+
+    with app.test_client() as client:
+        data = {"upload": [(io.BytesIO(content), "first.csv")]}
+        queued = client.post(url, data=data, content_type="multipart/form-data")
+        work(burst=True)
+        data = {"upload": [(io.BytesIO(content), "again.csv")]}
+        resp = client.post(url, data=data, content_type="multipart/form-data")
+
+    (entry,) = resp.json["results"]
+    assert "job" not in entry
+    assert entry["row_count"] == 2
+    job = ValidationJobModel.query.get(queued.json["results"][0]["job"])
+    assert ResultModel.query.get(entry["result"]).cloned_from == job.result_id
+
+
+def test_bulk_validation_needs_files(app, db):
+    with app.test_client() as client:
+        resp = client.post(url_for("api.validate_bulk_uploads"))
+    assert resp.status_code == 400
@@ -0,0 +1,29 @@
+from application.edits import apply_json_changes, json_changes
+
+
+def test_json_changes_rebuild_the_changed_value():
+    before = {
+        "valid": False,
+        "tables": [{"errors": [{"row-number": n} for n in range(1, 20)]}],
+        "notes": "checked",
+    }
+    after = {
+        "valid": False,
+        "tables": [{"errors": [{"row-number": n} for n in range(1, 20) if n != 7]}],
+        "time": 0.1,
+    }
+
+    changes = json_changes(before, after)
+    assert apply_json_changes(before, changes) == after
+    assert changes["unset"] == ["notes"]
+    # only the error that went is recorded, not the ones that stayed
+    assert changes["set"]["tables"] == {
+        "splice": [[0, {"set": {"errors": {"splice": [[6, 7, []]]}}}]]
+    }
+    assert json_changes(after, after) is None
+
+
+def test_json_changes_replace_values_that_changed_completely():
+    assert json_changes([1, 2], [3, 4]) == {"value": [3, 4]}
+    assert json_changes({"a": 1}, [1]) == {"value": [1]}
+    assert apply_json_changes([1, 2], json_changes([1, 2], [2, 1, 3])) == [2, 1, 3]
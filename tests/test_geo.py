@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from application.geo import Sites, coordinates, national_grid_to_osgb36, to_wgs84
+
+
+def test_national_grid_to_osgb36_matches_the_ordnance_survey_example():
+    lat, lon = national_grid_to_osgb36(np.array([651409.903]), np.array([313177.270]))
+    # 52°39'27.2531"N 1°43'4.5177"E
+    assert np.degrees(lat[0]) == pytest.approx(52.6575703, abs=1e-7)
+    assert np.degrees(lon[0]) == pytest.approx(1.7179216, abs=1e-7)
+
+
+def test_to_wgs84_reads_grid_references_and_degrees():
+    x = coordinates(["447560", "-1.5", "", "not-a-geox", "9999999"])
+    y = coordinates(["130729", "52.1", "1", "2", "3"])
+    longitude, latitude = to_wgs84(x, y)
+
+    assert longitude[0] == pytest.approx(-1.322528, abs=1e-6)
+    assert latitude[0] == pytest.approx(51.073925, abs=1e-6)
+    assert (longitude[1], latitude[1]) == (-1.5, 52.1)
+    assert np.isnan(longitude[2:]).all()
+
+
+def test_sites_are_clustered_by_grid_cell():
+    rows = [
+        (1, {"GeoX": "-1.5001", "GeoY": "52.1001", "SiteReference": "a"}),
+        (2, {"GeoX": "-1.5002", "GeoY": "52.1002", "SiteReference": "b"}),
+        (3, {"GeoX": "0.5", "GeoY": "51.5", "SiteReference": "c"}),
+        (4, {"GeoX": "", "GeoY": "", "SiteReference": "d"}),
+    ]
+    sites = Sites.from_rows(rows)
+    assert len(sites) == 3
+
+    clusters, site = sites.features(cell_size=0.01)
+    assert clusters["properties"] == {"cluster": True, "count": 2}
+    assert site["properties"]["row"] == 3
+    assert site["geometry"]["coordinates"] == [0.5, 51.5]
+    assert len(sites.within(-2, 52, -1, 53).features()) == 2
@@ -0,0 +1,67 @@
+import datetime
+import time
+
+from flask import url_for
+from werkzeug.datastructures import FileStorage
+
+from application.frontend.models import ResultModel, ValidationJobModel
+from application.jobs import enqueue_validation, heartbeat, work
+from application.utils import read_upload
+
+
+def test_worker_validates_queued_upload(db, csv_file):
+    with open(csv_file, "rb") as f:
+        with read_upload(FileStorage(stream=f, filename="register.csv")) as upload:
+            job = enqueue_validation(upload)
+
+    assert job.status == ValidationJobModel.PENDING
+    assert work(burst=True) == 1
+
+    job = ValidationJobModel.query.get(job.id)
+    assert job.status == ValidationJobModel.COMPLETE
+    assert job.upload is None
+    assert ResultModel.query.get(job.result_id).row_count == 2
+
+
+def test_worker_exits_when_queue_is_empty(db):
+    assert work(burst=True) == 0
+
+
+def test_worker_gives_up_on_a_job_that_keeps_failing(app, db):
+    job = ValidationJobModel(
+        filename="register.csv",
+        status=ValidationJobModel.RUNNING,
+        attempts=app.config["VALIDATION_JOB_ATTEMPTS"],
+        heartbeat_at=datetime.datetime(2020, 1, 1),
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    assert work(burst=True) == 0
+    job = ValidationJobModel.query.get(job.id)
+    assert job.status == ValidationJobModel.FAILED
+
+
+def test_heartbeat_marks_job_as_running(db):
+    job = ValidationJobModel(filename="register.csv")
+    db.session.add(job)
+    db.session.commit()
+
+    with heartbeat(job.id, interval=0.01):
+        time.sleep(0.1)
+
+    db.session.refresh(job)
+    assert job.heartbeat_at is not None
+
+
+def test_job_page_for_an_expired_result_goes_back_to_upload(app, db):
+    job = ValidationJobModel(
+        filename="register.csv", status=ValidationJobModel.COMPLETE
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    with app.test_client() as client:
+        resp = client.get(url_for("frontend.validation_job", job=job.id))
+        assert resp.status_code == 302
+        assert resp.headers["Location"].endswith(url_for("frontend.validate"))
@@ -1,4 +1,7 @@
-from application.frontend.models import ResultModel
+import copy
+import datetime
+
+from application.frontend.models import ResultEditModel, ResultModel, ResultView
 
 
 def test_post_model(session, result):
@@ -8,3 +11,260 @@ def test_post_model(session, result):
 
     assert result_model.id
     assert len(result.rows) == 2
+
+
+def test_result_model_stores_a_row_per_register_row(session, result):
+    result_model = ResultModel(result)
+    session.add(result_model)
+    session.commit()
+
+    assert result_model.register_rows.count() == 2
+    assert result_model.to_dict()["rows"] == result.rows
+    assert result_model.register_rows[1].input == result.input[1]
+
+
+def test_result_model_keeps_a_summary(result):
+    result_model = ResultModel(result)
+
+    assert result_model.valid == result.valid()
+    assert result_model.error_count == result.error_count()
+    assert result_model.row_count == 2
+    assert result_model.summary["missing_headers"] == result.missing_headers()
+    assert result_model.summary["column_errors"]["GeoX"]["error_count"] == len(
+        result.errors_by_column["GeoX"]["errors"]
+    )
+
+
+def test_result_summary_loads_only_the_first_errors_for_each_column(
+    db, result, standard
+):
+    result_model = ResultModel(result)
+    db.session.add(result_model)
+    db.session.commit()
+
+    summary = ResultView(result_model, standard, errors_per_column=1)
+    geox = summary.errors_by_column["GeoX"]
+
+    assert geox["errors"] == result.errors_by_column["GeoX"]["errors"][:1]
+    assert geox["error_count"] == len(result.errors_by_column["GeoX"]["errors"])
+
+
+def test_result_model_clone_copies_result_and_rows(db, result):
+    uploads, hits = ResultModel.upload_stats()
+    result_model = ResultModel(result, fingerprint="abc:123")
+    db.session.add(result_model)
+    db.session.commit()
+
+    assert ResultModel.find_unedited("abc:123").id == result_model.id
+    clone_id = ResultModel.reuse("abc:123")
+    db.session.commit()
+
+    clone = ResultModel.query.get(clone_id)
+    assert clone.cloned_from == result_model.id
+    assert clone.fingerprint == "abc:123"
+    assert clone.summary == result_model.summary
+    assert clone.to_dict()["rows"] == result.rows
+    assert ResultModel.upload_stats() == (uploads + 2, hits + 1)
+
+
+def test_result_model_reuse_ignores_uploads_without_a_fingerprint(db, result):
+    db.session.add(ResultModel(result))
+    db.session.commit()
+
+    assert ResultModel.reuse(None) is None
+
+
+def test_result_model_purge_deletes_old_results_in_batches(db, result):
+    old = [ResultModel(result) for i in range(3)]
+    for hour, result_model in enumerate(old):
+        result_model.created_at = datetime.datetime(2020, 1, 1, hour)
+    recent = ResultModel(result)
+    db.session.add_all(old + [recent])
+    db.session.commit()
+    edited = copy.copy(result)
+    edited.rows = [dict(row, Notes="edited") for row in result.rows]
+    old[2].update(edited)
+    db.session.commit()
+    edited_id, edits = old[2].id, old[2].edits.count()
+    before = datetime.datetime(2020, 1, 2)
+
+    assert ResultModel.purge(before, batch_size=2)[:3] == (2, 4, 0)
+    purged, rows, purged_edits, size = ResultModel.purge(before, batch_size=2)
+    db.session.commit()
+
+    assert (purged, rows, purged_edits) == (1, 2, edits)
+    assert edits > 0
+    assert size > 0
+    assert ResultEditModel.query.filter_by(result_id=edited_id).count() == 0
+    assert ResultModel.query.get(recent.id) is not None
+    assert ResultModel.query.filter(ResultModel.created_at < before).count() == 0
+
+
+def test_result_model_pages_column_errors_by_row(db, result):
+    result_model = ResultModel(result)
+    db.session.add(result_model)
+    db.session.commit()
+    errors = sorted(result.errors_by_column["GeoX"]["errors"], key=lambda e: e["row"])
+
+    first = ResultModel.column_errors(result_model.id, "GeoX", limit=1)
+    rest = ResultModel.column_errors(result_model.id, "GeoX", after=first[-1]["row"])
+
+    assert first == errors[:1]
+    assert rest == errors[1:]
+    assert ResultModel.column_errors(result_model.id, "NotAColumn") == []
+
+
+def test_result_model_to_dict_can_give_columnar_rows(db, result):
+    result_model = ResultModel(result)
+    db.session.add(result_model)
+    db.session.commit()
+
+    columnar = result_model.to_dict(columnar=True)
+    assert [dict(row) for row in columnar["rows"]] == result.rows
+    assert columnar["input"].to_dicts() == result_model.to_dict()["input"]
+
+
+def test_result_rows_are_read_back_whatever_they_were_stored_with(db, result):
+    from application.extensions import row_codec
+
+    result_model = ResultModel(result)
+    db.session.add(result_model)
+    db.session.commit()
+    result_model.register_rows[0].update(
+        result_model.row_headers, {"SiteReference": "BLR/1"}
+    )
+    db.session.commit()
+    level, row_codec.level = row_codec.level, 0
+    try:
+        result_model.register_rows[1].update(
+            result_model.row_headers, {"SiteReference": "BLR/2"}
+        )
+        db.session.commit()
+    finally:
+        row_codec.level = level
+
+    stored = db.session.execute(
+        db.text(
+            "SELECT get_byte(changes, 0) FROM result_row_model "
+            "WHERE result_id = :id ORDER BY row_number"
+        ),
+        {"id": result_model.id},
+    ).scalars()
+    assert list(stored) == [ord("x"), ord("{")]
+    db.session.expire_all()
+    assert [row["SiteReference"] for row in result_model.rows] == ["BLR/1", "BLR/2"]
+
+
+def test_result_rows_are_stored_as_changes_to_their_input(db, result):
+    result_model = ResultModel(result)
+    db.session.add(result_model)
+    db.session.commit()
+
+    stored = result_model.register_rows[0]
+    assert stored.data is None
+    assert stored.changes == {}
+    assert result_model.rows == result.rows
+
+    edited = dict(result.rows[0], GeoX="-1.3", EndDate="")
+    del edited["Notes"]
+    stored.update(result_model.row_headers, edited)
+    db.session.commit()
+
+    assert stored.changes == {
+        "set": {"GeoX": "-1.3", "EndDate": ""},
+        "unset": ["Notes"],
+    }
+    assert result_model.rows[0] == edited
+
+
+def test_result_rows_stored_in_full_are_changed_over_on_update(db, result):
+    result_model = ResultModel(result)
+    result_model.row_headers = None
+    for row, data in zip(result_model.register_rows, result.rows):
+        row.data, row.changes = data, None
+    db.session.add(result_model)
+    db.session.commit()
+
+    assert result_model.rows == result.rows
+    result_model.update(result)
+    db.session.commit()
+
+    assert result_model.row_headers
+    assert [row.data for row in result_model.register_rows] == [None, None]
+    assert result_model.rows == result.rows
+
+
+def test_result_model_stores_each_error_once(db, result):
+    result_model = ResultModel(result)
+    db.session.add(result_model)
+    db.session.commit()
+
+    assert len(result_model.errors) == sum(
+        len(error["errors"]) for error in result.errors_by_column.values()
+    )
+    assert result_model.errors_by_column == result.errors_by_column
+    assert result_model.errors_by_row == result.errors_by_row
+    assert result_model.to_dict(columnar=True)["errors_by_row"][-1] == (
+        result.errors_by_row[-1]
+    )
+
+
+def test_result_model_update_writes_only_what_changed(db, result, caplog):
+    result_model = ResultModel(result)
+    db.session.add(result_model)
+    db.session.commit()
+
+    result_model.update(result)
+    assert not db.session.dirty
+    assert "0 bytes written (no changes), 0 rows changed" in caplog.text
+
+    edited = copy.copy(result)
+    edited.rows = [dict(result.rows[0], Notes="edited")] + result.rows[1:]
+    result_model.update(edited)
+    dirty = [getattr(o, "row_number", o) for o in db.session.dirty]
+    assert sorted(dirty, key=str) == [1, result_model]
+    assert "1 rows changed" in caplog.text
+    db.session.commit()
+
+
+def test_result_model_edits_can_be_undone_and_redone(app, db, result, monkeypatch):
+    monkeypatch.setitem(app.config, "RESULT_SNAPSHOT_INTERVAL", 2)
+    result_model = ResultModel(result)
+    db.session.add(result_model)
+    db.session.commit()
+
+    def saved():
+        db.session.refresh(result_model)
+        return result_model.rows, copy.deepcopy(result_model.state())
+
+    versions = [saved()]
+    for n in range(1, 6):
+        edited = copy.copy(result)
+        edited.result = dict(result.result, time=n)
+        edited.rows = [dict(result.rows[0], Notes=f"edit {n}")] + result.rows[1:]
+        result_model.update(edited, columns=["Notes"])
+        db.session.commit()
+        versions.append(saved())
+    snapshots = result_model.edits.filter(
+        ResultEditModel.snapshot.isnot(None)
+    ).with_entities(ResultEditModel.number)
+    assert [number for number, in snapshots] == [0, 2, 4]
+
+    for n in range(4, -1, -1):
+        assert result_model.undo()
+        db.session.commit()
+        assert saved() == versions[n]
+    assert not result_model.undo()
+    for n in range(1, 6):
+        assert result_model.redo()
+        db.session.commit()
+        assert saved() == versions[n]
+    assert not result_model.redo()
+
+    result_model.restore(3)
+    result_model.update(result, columns=["Notes"])
+    db.session.commit()
+    assert result_model.edit_number == 4
+    assert saved()[0] == result.rows
+    # the undone edits went with the new edit
+    assert not result_model.redo()
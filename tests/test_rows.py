@@ -0,0 +1,35 @@
+import pickle
+
+from application.rows import ColumnarRows, row_dicts
+
+
+def test_columnar_rows_read_and_write_like_dicts():
+    dicts = [
+        {"SiteReference": "BLR/1", "Hectares": "0.5"},
+        {"SiteReference": "BLR/2", "Notes": "none"},
+    ]
+    rows = ColumnarRows.from_dicts(dicts)
+
+    assert len(rows) == 2
+    assert rows[0] == dicts[0]
+    assert rows[-1] == dicts[1]
+    assert "Notes" not in rows[0]
+    assert rows[1].get("Hectares", "") == ""
+
+    rows[0]["Notes"] = "added"
+    assert rows[1].pop("Notes") == "none"
+    assert rows.to_dicts() == [
+        {"SiteReference": "BLR/1", "Hectares": "0.5", "Notes": "added"},
+        {"SiteReference": "BLR/2"},
+    ]
+
+
+def test_columnar_rows_slice_and_pickle():
+    dicts = [{"SiteReference": f"BLR/{i}"} for i in range(5)]
+    rows = ColumnarRows.from_dicts(dicts)
+
+    chunk = rows[1:3]
+    assert isinstance(chunk, ColumnarRows)
+    assert row_dicts(chunk) == dicts[1:3]
+    assert pickle.loads(pickle.dumps(rows)).to_dicts() == dicts
+    assert row_dicts(dicts) is dicts
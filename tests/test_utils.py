@@ -0,0 +1,237 @@
+import copy
+import csv
+import hashlib
+import io
+import os
+import tempfile
+from unittest import mock
+
+import pytest
+from validator.validator import check_data, validate_file
+
+from application.standards import get_standard
+from application.utils import (
+    Edit,
+    HashedUpload,
+    HeaderChanges,
+    ParseOnlyStandard,
+    apply_all_fixes,
+    check_rows,
+    generate_csv,
+    merge_reports,
+    revalidate_columns,
+    revalidate_result,
+    update_and_save_headers,
+)
+
+
+def test_generate_csv_streams_header_then_rows_in_chunks():
+    rows = [{"SiteReference": f"BLR/{i}", "Hectares": "0.5"} for i in range(5)]
+    input = [{"SiteReference": f"BLR/{i}", "Part2": f"part2-{i}"} for i in range(5)]
+    fields = ["SiteReference", "Hectares", "Part2"]
+
+    chunks = list(generate_csv(zip(rows, input), fields, ["Part2"], chunk_size=2))
+
+    assert chunks[0] == "SiteReference,Hectares,Part2\r\n"
+    assert len(chunks) == 4
+    reader = csv.DictReader(io.StringIO("".join(chunks)))
+    output = list(reader)
+    assert len(output) == 5
+    assert output[3] == {
+        "SiteReference": "BLR/3",
+        "Hectares": "0.5",
+        "Part2": "part2-3",
+    }
+    assert "Part2" not in rows[0]
+
+
+def test_revalidate_columns_matches_full_revalidation(app, result, standard):
+    edited = revalidate_result(copy.deepcopy(result), standard)
+    for row in edited.rows:
+        row["FirstAddedDate"] = "01/12/2017"
+
+    full = revalidate_result(copy.deepcopy(edited), standard)
+    partial = revalidate_result(edited, standard, columns=["FirstAddedDate"])
+
+    assert partial.error_count() == full.error_count()
+    assert partial.errors_by_column == full.errors_by_column
+
+
+def test_revalidate_columns_keeps_errors_for_whole_rows(app, result, standard):
+    edited = revalidate_result(copy.deepcopy(result), standard)
+    blank_row = {"code": "blank-row", "row-number": 2, "message": "Row 2 is blank"}
+    edited.result["tables"][0]["errors"].append(blank_row)
+
+    report = revalidate_columns(edited, standard, ["FirstAddedDate"])
+
+    assert blank_row in report["tables"][0]["errors"]
+    assert report["error-count"] == edited.result["error-count"] + 1
+
+
+def test_revalidate_columns_checks_whole_rows_again_after_a_header_edit(
+    app, result, standard
+):
+    edited = revalidate_result(copy.deepcopy(result), standard)
+    edited.rows[1] = {header: "" for header in edited.rows[1]}
+    edited.input[0]["Extra"], edited.input[1]["Extra"] = "", "2019-01-01"
+    blank_row = {"code": "blank-row", "row-number": 2, "message": "Row 2 is blank"}
+    edited.result["tables"][0]["errors"].append(blank_row)
+
+    update = update_and_save_headers(
+        edited, [Edit(index=0, current="Extra", update="EndDate")], []
+    )
+    report = revalidate_columns(edited, standard, update["headers_added"])
+
+    assert edited.rows[1]["EndDate"] == "2019-01-01"
+    assert blank_row not in report["tables"][0]["errors"]
+    assert report == check_rows(edited.rows, standard.schema)
+
+
+def test_revalidate_columns_checks_everything_when_a_key_changes(app, result, standard):
+    keyed = copy.copy(standard)
+    keyed.schema = dict(standard.schema, primaryKey="SiteReference")
+    edited = revalidate_result(copy.deepcopy(result), keyed)
+    for row in edited.rows:
+        row["SiteReference"] = "BLR/1"
+        row["FirstAddedDate"] = "01/12/2017"
+
+    full = revalidate_result(copy.deepcopy(edited), keyed)
+    partial = revalidate_result(edited, keyed, columns=["SiteReference"])
+
+    assert partial.result == full.result
+
+
+def _chunk_report(errors, row_count):
+    table = {"headers": ["GeoX"], "errors": errors, "row-count": row_count}
+    return {"time": 0.1, "valid": not errors, "tables": [table]}
+
+
+def test_merge_reports_renumbers_rows_by_chunk():
+    header_error = {"code": "missing-header", "column-number": 2}
+    cell_error = {
+        "code": "type-or-format-error",
+        "row-number": 1,
+        "column-number": 1,
+        "message": 'The value "x" in row 1 and column 1 is not type "number"',
+    }
+    reports = [
+        _chunk_report([header_error], 4),
+        _chunk_report([header_error, cell_error], 4),
+    ]
+
+    merged = merge_reports(reports, chunk_size=3)
+    table = merged["tables"][0]
+
+    assert merged["error-count"] == 2
+    assert not merged["valid"]
+    assert table["row-count"] == 7
+    assert table["errors"][0] == header_error
+    assert table["errors"][1]["row-number"] == 4
+    assert "in row 4 and column 1" in table["errors"][1]["message"]
+
+
+def test_check_rows_in_one_process_when_rows_repeat_across_chunks(app, standard):
+    rows = [{"SiteReference": f"BLR/{i}", "Hectares": "1"} for i in range(8)]
+    rows[7]["SiteReference"] = "BLR/0"
+    schema = dict(standard.schema, primaryKey="SiteReference")
+    config = {"VALIDATION_WORKERS": 2, "PARALLEL_VALIDATION_THRESHOLD": 1}
+
+    with mock.patch.dict(app.config, config):
+        with mock.patch("application.utils.ProcessPoolExecutor") as pool:
+            report = check_rows(rows, schema)
+
+    assert not pool.called
+    assert report == check_data(rows, schema)
+
+
+def test_parse_only_standard_reads_a_file_without_checking_values(csv_file, standard):
+    full = validate_file(csv_file, standard)
+    parsed = validate_file(csv_file, ParseOnlyStandard(standard))
+
+    assert parsed.input == full.input
+    assert parsed.rows == full.rows
+    assert parsed.meta_data == full.meta_data
+    assert not [e for e in parsed.result["tables"][0]["errors"] if "row-number" in e]
+
+
+def test_hashed_upload_writes_the_stream_once_to_a_temporary_file(csv_file):
+    with open(csv_file, "rb") as f:
+        content = f.read()
+
+    with HashedUpload("register.csv", io.BytesIO(content)) as upload:
+        assert upload.digest == hashlib.sha256(content).hexdigest()
+        assert upload.size == len(content)
+        assert upload.path.endswith(".csv")
+        assert upload.getvalue() == content
+        path = upload.path
+    assert not os.path.exists(path)
+
+
+def test_hashed_upload_removes_its_file_if_reading_fails(monkeypatch, tmp_path):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    stream = mock.Mock()
+    stream.read.side_effect = [b"OrganisationURI\n", IOError("connection reset")]
+
+    with pytest.raises(IOError):
+        HashedUpload("register.csv", stream)
+    assert not list(tmp_path.iterdir())
+
+
+def test_standard_is_compiled_once_per_process(standard):
+    compiled = get_standard()
+
+    assert get_standard() is compiled
+    assert compiled.headers == tuple(standard.current_standard_headers())
+    assert compiled.is_standard_header("SiteReference")
+    assert not compiled.is_standard_header("Part2")
+
+
+def test_header_changes_are_made_in_one_pass():
+    result = mock.Mock(
+        input=[{"Site": "BLR/1", "Size": "0.5", "Extra": "x"}, {"Site": "BLR/2"}],
+        rows=[{}, {}],
+    )
+    edits = [
+        Edit(index=0, current="Site", update="SiteReference"),
+        Edit(index=1, current="Size", update="Hectares"),
+        Edit(index=2, current="Extra", update="Extra"),
+    ]
+
+    changes = HeaderChanges(edits, ["Notes", "Hectares"])
+    changes.apply(result)
+
+    assert result.rows == [
+        {"SiteReference": "BLR/1", "Hectares": "0.5", "Notes": ""},
+        {"SiteReference": "BLR/2", "Notes": ""},
+    ]
+    assert result.input == [{"Extra": "x"}, {}]
+    assert changes.headers_added == ["SiteReference", "Hectares", "Notes"]
+    assert changes.headers_removed == ["Site", "Size", "Extra"]
+    assert changes.header_changes == [
+        ("SiteReference", "Site"),
+        ("Hectares", "Size"),
+        ("Notes", "ADDED"),
+    ]
+
+
+def test_apply_all_fixes_fixes_every_column_in_one_pass():
+    errors_by_column = {
+        "FirstAddedDate": {
+            "errors": [{"row": 2, "fix": "2019-01-01"}, {"row": 1, "fix": None}]
+        },
+        "LastUpdatedDate": {"errors": [{"row": 2, "fix": "2019-02-01"}]},
+    }
+    rows = [
+        {"FirstAddedDate": "1/1/19", "LastUpdatedDate": ""},
+        {"FirstAddedDate": "1/1/19", "LastUpdatedDate": "1/2/19"},
+    ]
+    result = mock.Mock(errors_by_column=errors_by_column, rows=rows)
+
+    fixes = apply_all_fixes(result, ["FirstAddedDate", "LastUpdatedDate"])
+
+    assert rows[1] == {"FirstAddedDate": "2019-01-01", "LastUpdatedDate": "2019-02-01"}
+    assert rows[0]["FirstAddedDate"] == "1/1/19"
+    assert fixes == {
+        "FirstAddedDate": [{"row": 2, "from": "1/1/19", "to": "2019-01-01"}],
+        "LastUpdatedDate": [{"row": 2, "from": "1/2/19", "to": "2019-02-01"}],
+    }
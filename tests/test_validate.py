@@ -1,5 +1,8 @@
+import copy
+from unittest import mock
+
 from bs4 import BeautifulSoup
-from flask import url_for
+from flask import g, url_for
 
 
 def test_upload_and_validate_file(app, csv_file):
@@ -7,3 +10,311 @@ def test_upload_and_validate_file(app, csv_file):
         resp = client.get(url_for("frontend.validate"))
         soup = BeautifulSoup(resp.data.decode("utf-8"), "html5lib")
         assert soup.h1.text == "Upload your brownfield land register"
+
+
+def test_result_page_is_not_modified_for_current_etag(app, db, result):
+    from application.frontend.models import ResultModel
+
+    result_model = ResultModel(result)
+    db.session.add(result_model)
+    db.session.commit()
+
+    with app.test_client() as client:
+        url = url_for("frontend.validation_result", result=result_model.id)
+        resp = client.get(url)
+        assert resp.status_code == 200
+        etag = resp.headers["ETag"]
+
+        resp = client.get(url, headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+
+        edited = copy.copy(result)
+        edited.rows = [dict(row, Notes="edited") for row in result.rows]
+        result_model.update(edited)
+        db.session.commit()
+        resp = client.get(url, headers={"If-None-Match": etag})
+        assert resp.status_code == 200
+        assert resp.headers["ETag"] != etag
+
+
+def test_result_page_that_uses_the_session_is_not_shared(app, db, result):
+    from flask import session
+
+    from application.extensions import render_cache
+    from application.frontend.models import ResultModel
+
+    result_model = ResultModel(result)
+    db.session.add(result_model)
+    db.session.commit()
+
+    def render_result(result):
+        return f"<p>{session.get('csrf_token')}</p>"
+
+    with mock.patch.object(render_cache, "max_size", 10):
+        with mock.patch("application.frontend.views.render_result", render_result):
+            with app.test_client() as client:
+                url = url_for("frontend.validation_result", result=result_model.id)
+                resp = client.get(url)
+        assert resp.status_code == 200
+        assert "ETag" not in resp.headers
+        assert resp.cache_control.private and resp.cache_control.no_store
+        assert not render_cache.pages
+
+        with app.test_client() as client:
+            resp = client.get(url)
+        assert resp.headers["ETag"]
+        assert len(render_cache.pages) == 1
+        render_cache.clear()
+
+
+def test_column_errors_page_links_to_the_next_page(app, db, result):
+    from application.frontend.models import ResultModel
+
+    result_model = ResultModel(result)
+    db.session.add(result_model)
+    db.session.commit()
+
+    with mock.patch("application.frontend.views.ERRORS_PER_PAGE", 1):
+        with app.test_client() as client:
+            url = url_for(
+                "frontend.column_errors", result=result_model.id, column="GeoX"
+            )
+            resp = client.get(url)
+            assert resp.status_code == 200
+            soup = BeautifulSoup(resp.data.decode("utf-8"), "html5lib")
+            assert len(soup.select("ul.govuk-list li")) == 1
+            assert "after=" in soup.find("a", string="Next errors")["href"]
+
+
+def test_edit_headers_page_does_not_load_the_register(app, db, result):
+    from application.frontend.models import ResultModel
+
+    result_model = ResultModel(result)
+    db.session.add(result_model)
+    db.session.commit()
+
+    with mock.patch("application.frontend.views.Result") as full_result:
+        with app.test_client() as client:
+            url = url_for("frontend.edit_headers", result=result_model.id)
+            resp = client.get(url)
+            assert resp.status_code == 200
+            url = url_for("frontend.edit_column", result=result_model.id, column="GeoX")
+            resp = client.get(url)
+            assert resp.status_code == 200
+    full_result.assert_not_called()
+
+
+def results_with_bad_dates(result, standard):
+    from validator.validation_result import Result
+    from validator.validator import check_data
+
+    rows = [
+        dict(row, FirstAddedDate="01/12/2017", LastUpdatedDate="08/12/2017")
+        for row in result.rows
+    ]
+    return Result(
+        result=check_data(rows, standard.schema),
+        input=result.input,
+        rows=rows,
+        meta_data=result.meta_data,
+        standard=standard,
+    )
+
+
+def test_apply_all_fixes_checks_and_saves_once(app, db, result, standard):
+    from application.frontend.models import ResultModel
+    from application.utils import revalidate_result
+
+    broken = results_with_bad_dates(result, standard)
+    result_model = ResultModel(broken)
+    db.session.add(result_model)
+    db.session.commit()
+    assert len(broken.errors_by_column["FirstAddedDate"]["errors"]) == len(broken.rows)
+
+    with mock.patch(
+        "application.frontend.views.revalidate_result", wraps=revalidate_result
+    ) as revalidate:
+        with app.test_client() as client:
+            url = url_for("frontend.edit_all_fixes", result=result_model.id)
+            resp, token = get_form(client, url)
+            assert resp.status_code == 200
+            revalidate.assert_not_called()
+            resp = client.post(url, data={"csrf_token": token})
+            assert resp.status_code == 200
+    revalidate.assert_called_once()
+
+    db.session.refresh(result_model)
+    assert "FirstAddedDate" not in result_model.summary["column_errors"]
+    assert "LastUpdatedDate" not in result_model.summary["column_errors"]
+
+
+def test_apply_all_fixes_when_there_are_none(app, db, result, monkeypatch):
+    from application.frontend.models import ResultModel
+
+    monkeypatch.setitem(app.config, "WTF_CSRF_ENABLED", False)
+    result_model = ResultModel(result)
+    db.session.add(result_model)
+    db.session.commit()
+
+    with app.test_client() as client:
+        url = url_for("frontend.edit_all_fixes", result=result_model.id)
+        for resp in [client.get(url), client.post(url)]:
+            assert resp.status_code == 200
+            assert b"There are no fixes available" in resp.data
+    db.session.refresh(result_model)
+    assert result_model.edit_number == 0
+
+
+def get_form(client, url):
+    """Gets a page with a form, and returns it with its csrf token."""
+    # the tests share one app context, so drop any token made for another
+    # client's session
+    g.pop("csrf_token", None)
+    resp = client.get(url)
+    soup = BeautifulSoup(resp.data.decode("utf-8"), "html5lib")
+    return resp, soup.find("input", attrs={"name": "csrf_token"})["value"]
+
+
+def save_another_edit_first(db, result_id):
+    # as if an edit from another tab saved while this one was being made
+    with db.engine.begin() as connection:
+        connection.execute(
+            db.text("UPDATE result_model SET version = version + 1 WHERE id = :id"),
+            {"id": result_id},
+        )
+
+
+def test_an_edit_is_made_again_if_another_edit_saves_first(app, db, result):
+    from application.frontend.models import ResultModel
+    from application.frontend.views import get_result_view, save_edit
+
+    result_model = ResultModel(result)
+    db.session.add(result_model)
+    db.session.commit()
+    versions = []
+
+    def edit(result_view):
+        versions.append(result_view.model.version)
+        if len(versions) == 1:
+            save_another_edit_first(db, result_view.id)
+        edited = copy.copy(result)
+        edited.rows = [dict(row, Notes=f"edit {len(versions)}") for row in result.rows]
+        result_view.model.update(edited)
+        return len(versions)
+
+    assert save_edit(get_result_view(result_model.id), edit) == 2
+    assert versions == [1, 2]
+    db.session.refresh(result_model)
+    assert result_model.version == 3
+    assert result_model.rows[0]["Notes"] == "edit 2"
+
+
+def test_an_edit_gives_up_if_other_edits_keep_saving_first(
+    app, db, result, standard, monkeypatch
+):
+    from application.frontend.models import ResultModel
+    from application.frontend.views import full_result
+
+    monkeypatch.setitem(app.config, "WTF_CSRF_ENABLED", False)
+    result_model = ResultModel(results_with_bad_dates(result, standard))
+    db.session.add(result_model)
+    db.session.commit()
+
+    def always_beaten(result_view):
+        save_another_edit_first(db, result_view.id)
+        return full_result(result_view)
+
+    with mock.patch("application.frontend.views.full_result", always_beaten):
+        with app.test_client() as client:
+            url = url_for("frontend.edit_all_fixes", result=result_model.id)
+            resp = client.post(url)
+    assert resp.status_code == 409
+    db.session.refresh(result_model)
+    assert result_model.version == 1 + app.config["RESULT_EDIT_ATTEMPTS"]
+    assert "FirstAddedDate" in result_model.summary["column_errors"]
+
+
+def test_fixes_can_be_undone_and_redone(app, db, result, standard, monkeypatch):
+    from application.frontend.models import ResultModel
+
+    monkeypatch.setitem(app.config, "WTF_CSRF_ENABLED", False)
+    result_model = ResultModel(results_with_bad_dates(result, standard))
+    db.session.add(result_model)
+    db.session.commit()
+
+    def column_errors():
+        db.session.refresh(result_model)
+        return set(result_model.summary["column_errors"])
+
+    broken = column_errors()
+    with app.test_client() as client:
+        client.post(url_for("frontend.edit_all_fixes", result=result_model.id))
+        fixed = column_errors()
+        assert "FirstAddedDate" in broken - fixed
+
+        resp = client.post(url_for("frontend.undo_edit", result=result_model.id))
+        assert resp.status_code == 302
+        assert column_errors() == broken
+        page = client.get(url_for("frontend.validation_result", result=result_model.id))
+        assert b"Redo change" in page.data
+
+        client.post(url_for("frontend.redo_edit", result=result_model.id))
+        assert column_errors() == fixed
+
+
+def test_undo_from_a_result_page_cached_for_another_session(app, db, result, standard):
+    from application.extensions import render_cache
+    from application.frontend.models import ResultModel
+
+    result_model = ResultModel(results_with_bad_dates(result, standard))
+    db.session.add(result_model)
+    db.session.commit()
+    fixes_url = url_for("frontend.edit_all_fixes", result=result_model.id)
+    result_url = url_for("frontend.validation_result", result=result_model.id)
+
+    with mock.patch.object(render_cache, "max_size", 10):
+        with app.test_client() as client:
+            resp, token = get_form(client, fixes_url)
+            client.post(fixes_url, data={"csrf_token": token})
+            page = client.get(result_url)
+        assert render_cache.pages
+
+        with app.test_client() as other_client:
+            cached = other_client.get(result_url)
+            assert cached.data == page.data
+            assert cached.headers["ETag"]
+            assert b"csrf_token" not in cached.data
+            soup = BeautifulSoup(cached.data.decode("utf-8"), "html5lib")
+            undo_url = soup.find("a", string="Undo last change")["href"]
+
+            resp, token = get_form(other_client, undo_url)
+            resp = other_client.post(undo_url, data={"csrf_token": token})
+        render_cache.clear()
+
+    assert resp.status_code == 302
+    db.session.refresh(result_model)
+    assert result_model.edit_number == 0
+
+
+def test_result_page_only_shows_a_map_with_a_mapbox_token(app, db, result, monkeypatch):
+    from application.extensions import render_cache
+    from application.frontend.models import ResultModel
+
+    valid = copy.copy(result)
+    valid.result = dict(result.result, valid=True)
+    result_model = ResultModel(valid)
+    db.session.add(result_model)
+    db.session.commit()
+    url = url_for("frontend.validation_result", result=result_model.id)
+    render_cache.clear()
+
+    with app.test_client() as client:
+        monkeypatch.setitem(app.config, "MAPBOX_TOKEN", None)
+        page = client.get(url).data
+        assert b"map-original" not in page
+        assert b"leaflet" not in page
+
+        monkeypatch.setitem(app.config, "MAPBOX_TOKEN", "pk.token")
+        page = client.get(url).data
+        assert b'id="map-original"' in page
+        assert b'{mapbox_token: "pk.token"}' in page